@@ -0,0 +1,186 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import generate_sql
+
+# Dataset scales, from the built-in dummy data up to a few million rows.
+# None means the embedded dummy data; otherwise synthetic knob overrides.
+SCALES = {
+    "dummy": None,
+    "small": {},
+    "medium": {"users": 10000, "workspaces": 100},
+    "large": {"users": 100000, "workspaces": 1000},
+    "xlarge": {"users": 200000, "workspaces": 3000},
+}
+DEFAULT_SCALES = ("dummy", "small", "medium")
+
+OUTPUT_NAMES = {"binary": "out_pgcopy", "sqlite": "out.db"}
+
+def scale_shards(scale, seed=0):
+    knobs = SCALES[scale]
+    if knobs is None:
+        return generate_sql.record_shards(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+    return generate_sql.synthetic_shards(seed, **{**generate_sql.SYNTHETIC_DEFAULTS, **knobs})
+
+def output_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def peak_rss(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS. RUSAGE_CHILDREN
+    # covers the --jobs worker processes once they have been reaped, which
+    # write_shards() does before returning.
+    rss = resource.getrusage(who).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def table_breakdown(fmt, shards):
+    # Encode-only pass per table: rows, encoded bytes and time spent in that
+    # table's encoder, without generation or sink costs.
+    tables = {}
+    for chunk in generate_sql.iter_chunks(generate_sql.shard_rows(shards)):
+        by_table = {}
+        for table, row in chunk:
+            by_table.setdefault(table, []).append((table, row))
+        for table, rows in by_table.items():
+            started = time.perf_counter()
+            encoded = generate_sql.encode_chunk(fmt, rows)
+            elapsed = time.perf_counter() - started
+            stats = tables.setdefault(table, {"rows": 0, "bytes": 0, "seconds": 0.0})
+            stats["rows"] += len(rows)
+            stats["seconds"] += elapsed
+            if fmt != "sqlite":
+                stats["bytes"] += sum(len(data) for data, _, _ in encoded.values())
+    for stats in tables.values():
+        seconds = max(stats["seconds"], 1e-9)
+        stats["rows_per_s"] = stats["rows"] / seconds
+        stats["mb_per_s"] = stats["bytes"] / seconds / 1e6
+    return tables
+
+def run_case(scale, fmt, jobs, seed, breakdown):
+    # Runs in a fresh interpreter (see --run-case) so peak RSS is per case.
+    directory = tempfile.mkdtemp(prefix="bench_generate_sql_")
+    try:
+        output = os.path.join(directory, OUTPUT_NAMES.get(fmt, "out.sql"))
+        sink = generate_sql.SINKS[fmt](output, batch_size=1000, transaction_every=0)
+        started = time.perf_counter()
+        count = generate_sql.write_shards(fmt, scale_shards(scale, seed), sink, jobs=jobs)
+        wall = time.perf_counter() - started
+        rss = peak_rss()
+        worker_rss = peak_rss(resource.RUSAGE_CHILDREN)
+        size = output_size(output)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    result = {
+        "scale": scale, "format": fmt, "jobs": jobs, "rows": count, "bytes": size,
+        "wall_s": wall, "rows_per_s": count / max(wall, 1e-9), "mb_per_s": size / max(wall, 1e-9) / 1e6,
+        # The largest single process, parent or worker; with jobs > 1 the
+        # encoding happens in the workers.
+        "peak_rss_bytes": max(rss, worker_rss), "parent_rss_bytes": rss, "worker_rss_bytes": worker_rss,
+    }
+    if breakdown:
+        result["tables"] = table_breakdown(fmt, scale_shards(scale, seed))
+    return result
+
+def run_isolated(scale, fmt, jobs, seed, breakdown):
+    case = json.dumps({"scale": scale, "fmt": fmt, "jobs": jobs, "seed": seed, "breakdown": breakdown})
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-case", case],
+                               check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(completed.stdout)
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    # Flags cases whose rows/s fell by more than threshold relative to the
+    # baseline run. Returns the list of regression messages.
+    previous = {(r["scale"], r["format"], r["jobs"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scale"], result["format"], result["jobs"]))
+        if old is None:
+            continue
+        change = result["rows_per_s"] / old["rows_per_s"] - 1
+        line = f"{result['scale']:>7} {result['format']:>8} j{result['jobs']}: {old['rows_per_s']:>12,.0f} -> {result['rows_per_s']:>12,.0f} rows/s ({change:+.1%})"
+        if change < -threshold:
+            regressions.append(line)
+            line += "  REGRESSION"
+        print(line)
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generate_sql.py end to end across dataset scales and output formats.")
+    parser.add_argument("--scales", nargs="+", choices=tuple(SCALES), default=DEFAULT_SCALES,
+                        help="dataset scales to run (default: %(default)s)")
+    parser.add_argument("--formats", nargs="+", choices=tuple(generate_sql.SINKS), default=tuple(generate_sql.SINKS),
+                        help="output formats to run (default: all)")
+    parser.add_argument("--jobs", nargs="+", type=int, default=[1], metavar="N", help="worker counts to run (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N", help="runs per case; the fastest is kept (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed (default: %(default)s)")
+    parser.add_argument("--no-tables", action="store_true", help="skip the per-table encoder breakdown")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="results file to write (default: %(default)s)")
+    parser.add_argument("--compare", metavar="PATH", help="earlier results file to compare rows/s against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative rows/s drop reported as a regression (default: %(default)s)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if min(args.jobs) < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.run_case:
+        case = json.loads(args.run_case)
+        print(json.dumps(run_case(case["scale"], case["fmt"], case["jobs"], case["seed"], case["breakdown"])))
+        return
+    results = []
+    for scale in args.scales:
+        for fmt in args.formats:
+            for jobs in args.jobs:
+                runs = [run_isolated(scale, fmt, jobs, args.seed, not args.no_tables and i == 0) for i in range(args.repeat)]
+                best = min(runs, key=lambda r: r["wall_s"])
+                best.setdefault("tables", runs[0].get("tables"))
+                if best["tables"] is None:
+                    del best["tables"]
+                results.append(best)
+                print(f"{scale:>7} {fmt:>8} j{jobs}: {best['rows']:>9} rows {best['wall_s']:8.2f}s "
+                      f"{best['rows_per_s']:>12,.0f} rows/s {best['mb_per_s']:8.1f} MB/s "
+                      f"{best['peak_rss_bytes'] / 2**20:8.1f} MB peak RSS (largest process)")
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
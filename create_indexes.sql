@@ -0,0 +1,32 @@
+-- Indexes for the query patterns in index.js, from generate_sql.py --advise-indexes.
+-- Run this after the bulk load: building each index once over the loaded
+-- rows is much cheaper than maintaining it row by row during the load.
+-- Tables the seed data does not create are only indexed if they exist.
+SET maintenance_work_mem = '512MB';
+-- index.js:133
+CREATE INDEX IF NOT EXISTS workspace_members_workspace_id_idx ON workspace_members (workspace_id);
+-- index.js:250
+CREATE INDEX IF NOT EXISTS book_members_book_id_idx ON book_members (book_id);
+-- index.js:278
+CREATE INDEX IF NOT EXISTS publishing_stages_author_book_id_order_idx ON publishing_stages (author_book_id, "order" ASC);
+-- index.js:906
+CREATE INDEX IF NOT EXISTS tasks_book_id_idx ON tasks (book_id);
+-- index.js:980
+CREATE INDEX IF NOT EXISTS comments_task_id_idx ON comments (task_id);
+-- index.js:1008
+CREATE INDEX IF NOT EXISTS royalties_author_book_id_idx ON royalties (author_book_id);
+-- index.js:1036
+CREATE INDEX IF NOT EXISTS launch_plans_author_book_id_idx ON launch_plans (author_book_id);
+-- index.js:719, 748
+DO $$ BEGIN IF to_regclass('author_onboarding') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS author_onboarding_user_id_idx ON author_onboarding (user_id)'; END IF; END $$;
+-- index.js:809
+DO $$ BEGIN IF to_regclass('book_sales') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS book_sales_book_id_platform_sale_date_idx ON book_sales (book_id, platform, sale_date)'; END IF; END $$;
+-- index.js:584
+DO $$ BEGIN IF to_regclass('books_team_members') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS books_team_members_book_id_team_member_id_idx ON books_team_members (book_id, team_member_id)'; END IF; END $$;
+-- index.js:848
+DO $$ BEGIN IF to_regclass('campaigns') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS campaigns_workspace_id_status_idx ON campaigns (workspace_id, status)'; END IF; END $$;
+-- index.js:644
+DO $$ BEGIN IF to_regclass('resources') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS resources_workspace_id_category_idx ON resources (workspace_id, category)'; END IF; END $$;
+-- index.js:438
+DO $$ BEGIN IF to_regclass('team_members') IS NOT NULL THEN EXECUTE 'CREATE INDEX IF NOT EXISTS team_members_workspace_id_idx ON team_members (workspace_id)'; END IF; END $$;
+ANALYZE workspace_members, book_members, publishing_stages, tasks, comments, royalties, launch_plans;
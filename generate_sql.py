@@ -1,5 +1,42 @@
+import argparse
+import cProfile
+import hashlib
+import heapq
+import io
 import json
+import math
+import os
+import pickle
+import queue
+import random
 import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate, chain, islice
+from urllib.parse import quote
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 dummy_data = """
 export const dummyUsers = [
@@ -597,19 +634,174 @@ export const dummyWorkspaces = [
 ]
 """
 
-# Find the start and end of the dummyUsers array
-users_start_idx = dummy_data.find("export const dummyUsers = [") + len("export const dummyUsers = ")
-next_declaration_start_idx = dummy_data.find("export const dummyWorkspaces = [", users_start_idx)
-users_end_idx = dummy_data.rfind(']', 0, next_declaration_start_idx) + 1
-users_str = dummy_data[users_start_idx:users_end_idx].strip()
+# What may still follow a decoded number up to the end of the buffer if the
+# number itself is not complete yet.
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+class JsonStreamReader:
+    """Pull parser that decodes a JSON text one value at a time.
+
+    Only the current value (e.g. one workspace) and a read-ahead buffer are
+    held in memory. When a value is cut off by the end of the buffer, more
+    input is read with a doubling read size and decoding is retried, which
+    keeps the total work linear in the input size.
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # Returns the next non-whitespace character without consuming it, or
+        # "" at the end of the input.
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill(self.chunk_size):
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} in input, found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def skip_to(self, marker):
+        # Consumes input up to and including marker; False if it never occurs.
+        while True:
+            idx = self.buf.find(marker, self.pos)
+            if idx >= 0:
+                self.pos = idx + len(marker)
+                return True
+            self.pos = max(self.pos, len(self.buf) - len(marker) + 1)
+            if not self._fill(self.chunk_size):
+                return False
+
+    def identifier(self):
+        self.peek()
+        length = 0
+        while True:
+            end = self.pos + length
+            while end < len(self.buf) and (self.buf[end].isalnum() or self.buf[end] in "_$"):
+                end += 1
+            length = end - self.pos
+            if end < len(self.buf) or not self._fill(self.chunk_size):
+                break
+        name = self.buf[self.pos:self.pos + length]
+        self.pos += length
+        return name
 
-# Find the start and end of the dummyWorkspaces array
-workspaces_start_idx = dummy_data.find("export const dummyWorkspaces = [") + len("export const dummyWorkspaces = ")
-workspaces_end_idx = dummy_data.rfind("]") + 1
-workspaces_str = dummy_data[workspaces_start_idx:workspaces_end_idx].strip()
+    def value(self):
+        size = self.chunk_size
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # A bare number running into the end of the buffer may continue,
+            # also when the buffer ends in its fraction or exponent ("1." or
+            # "1e") and raw_decode stopped short of those.
+            if (not self.eof and isinstance(value, (int, float)) and NUMBER_TAIL.match(self.buf, end)
+                    and self._fill(size)):
+                continue
+            self.pos = end
+            return value
 
-dummyUsers = json.loads(users_str.replace("None", "null"))
-dummyWorkspaces = json.loads(workspaces_str.replace("None", "null"))
+    def iter_array(self):
+        self.expect("[")
+        while self.peek() != "]":
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+            elif self.peek() != "]":
+                raise ValueError(f"expected ',' or ']' in input, found {self.peek() or 'end of input'!r}")
+        self.pos += 1
+
+def record_kind(name):
+    # Maps array names (dummyUsers, users, workspaces, ...) to record kinds.
+    name = name.lower()
+    if name.endswith("users"):
+        return "user"
+    if name.endswith("workspaces"):
+        return "workspace"
+    return None
+
+def iter_js_records(f):
+    # The src/assets JS module shape: export const dummyUsers = [...] and
+    # export const dummyWorkspaces = [...] holding JSON-compatible literals.
+    reader = JsonStreamReader(f)
+    while reader.skip_to("export const "):
+        kind = record_kind(reader.identifier())
+        reader.expect("=")
+        if kind is None or reader.peek() != "[":
+            continue
+        for obj in reader.iter_array():
+            yield kind, obj
+
+def iter_json_records(f):
+    # A single {"users": [...], "workspaces": [...]} document.
+    reader = JsonStreamReader(f)
+    reader.expect("{")
+    while reader.peek() != "}":
+        kind = record_kind(reader.value())
+        reader.expect(":")
+        if kind is None or reader.peek() != "[":
+            reader.value()
+        else:
+            for obj in reader.iter_array():
+                yield kind, obj
+        if reader.peek() == ",":
+            reader.pos += 1
+
+def iter_ndjson_records(f):
+    # One {"user": {...}} or {"workspace": {...}} object per line.
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        obj = json.loads(line)
+        if len(obj) != 1 or record_kind(next(iter(obj)) + "s") is None:
+            raise ValueError(f"line {line_no}: expected a {{\"user\": ...}} or {{\"workspace\": ...}} object")
+        key, value = next(iter(obj.items()))
+        yield record_kind(key + "s"), value
+
+INPUT_READERS = {
+    "js": iter_js_records,
+    "json": iter_json_records,
+    "ndjson": iter_ndjson_records,
+}
+
+INPUT_EXTENSIONS = {".js": "js", ".mjs": "js", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+def resolve_input_format(path, input_format="auto"):
+    if input_format == "auto":
+        return "json" if path == "-" else INPUT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+    return input_format
+
+def read_input(path, input_format="auto"):
+    # Yields ("user" | "workspace", dict) records from a file, or stdin for "-".
+    input_format = resolve_input_format(path, input_format)
+    if path == "-":
+        yield from INPUT_READERS[input_format](sys.stdin)
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from INPUT_READERS[input_format](f)
 
 def escape_sql_string(s):
     if s is None:
@@ -618,70 +810,3055 @@ def escape_sql_string(s):
     escaped_s = str(s).replace("'", "''")
     return f"'{escaped_s}'"
 
-def format_timestamp(ts):
-    if ts is None:
-        return 'NULL'
-    # PostgreSQL expects ISO 8601 format with timezone.
-    # The dummy data already provides this, so we just need to wrap it.
-    return f"'{ts}'"
-
-sql_statements = []
-
-# Insert users
-for user in dummyUsers:
-    sql_statements.append(f"INSERT INTO users (id, name, email, image, created_at, updated_at) VALUES ({escape_sql_string(user['id'])}, {escape_sql_string(user['name'])}, {escape_sql_string(user['email'])}, {escape_sql_string(user['image'])}, {format_timestamp(user['createdAt'])}, {format_timestamp(user['updatedAt'])});")
-
-# Insert workspaces and their members, then books and their nested data
-for ws in dummyWorkspaces:
-    # Insert workspace
-    settings_json = json.dumps(ws['settings'])
-    escaped_settings_json = settings_json.replace("'", "''") # Escape single quotes within the JSON string for the SQL literal
-    sql_statements.append(f"INSERT INTO workspaces (id, name, slug, description, settings, owner_id, image_url, created_at, updated_at) VALUES ({escape_sql_string(ws['id'])}, {escape_sql_string(ws['name'])}, {escape_sql_string(ws['slug'])}, {escape_sql_string(ws['description'])}, '{escaped_settings_json}'::jsonb, {escape_sql_string(ws['ownerId'])}, {escape_sql_string(ws['image_url'])}, {format_timestamp(ws['createdAt'])}, {format_timestamp(ws['updatedAt'])});")
-
-    # Insert workspace members
-    for member in ws['members']:
-        sql_statements.append(f"INSERT INTO workspace_members (id, user_id, workspace_id, role, message, created_at, updated_at) VALUES ({escape_sql_string(member['id'])}, {escape_sql_string(member['userId'])}, {escape_sql_string(member['workspaceId'])}, {escape_sql_string(member['role'])}, {escape_sql_string(member['message'])}, {format_timestamp(member['user']['createdAt'])}, {format_timestamp(member['user']['updatedAt'])});")
-
-    # Insert books
-    for book in ws.get('books', []):
-        sql_statements.append(f"INSERT INTO books (id, workspace_id, name, description, priority, status, type, start_date, end_date, team_lead, progress, created_at, updated_at) VALUES ({escape_sql_string(book['id'])}, {escape_sql_string(book['workspaceId'])}, {escape_sql_string(book['name'])}, {escape_sql_string(book['description'])}, {escape_sql_string(book['priority'])}, {escape_sql_string(book['status'])}, {escape_sql_string(book['type'])}, {format_timestamp(book['start_date'])}, {format_timestamp(book['end_date'])}, {escape_sql_string(book['team_lead'])}, {book['progress']}, {format_timestamp(book['createdAt'])}, {format_timestamp(book['updatedAt'])});")
-
-        # Insert book members
-        for member in book.get('members', []):
-            sql_statements.append(f"INSERT INTO book_members (id, user_id, book_id, created_at, updated_at) VALUES ({escape_sql_string(member['id'])}, {escape_sql_string(member['userId'])}, {escape_sql_string(member['bookId'])}, {format_timestamp(member['user']['createdAt'])}, {format_timestamp(member['user']['updatedAt'])});")
-
-        # Insert publishing stages
-        for stage in book.get('publishingStages', []):
-            sql_statements.append(f"INSERT INTO publishing_stages (id, author_book_id, name, description, \"order\", created_at, updated_at) VALUES ({escape_sql_string(stage['id'])}, {escape_sql_string(stage['authorBookId'])}, {escape_sql_string(stage['name'])}, {escape_sql_string(stage['description'])}, {stage['order']}, {format_timestamp(book['createdAt'])}, {format_timestamp(book['updatedAt'])});")
-
-        # Insert tasks
-        for task in book.get('tasks', []):
-            sql_statements.append(f"INSERT INTO tasks (id, book_id, publishing_stage_id, title, description, status, type, priority, assignee_id, due_date, created_at, updated_at) VALUES ({escape_sql_string(task['id'])}, {escape_sql_string(task['bookId'])}, {escape_sql_string(task.get('publishingStageId'))}, {escape_sql_string(task['title'])}, {escape_sql_string(task['description'])}, {escape_sql_string(task['status'])}, {escape_sql_string(task['type'])}, {escape_sql_string(task['priority'])}, {escape_sql_string(task['assigneeId'])}, {format_timestamp(task['due_date'])}, {format_timestamp(task['createdAt'])}, {format_timestamp(task['updatedAt'])});")
-
-            # Insert comments for tasks
-            for comment in task.get('comments', []):
-                # Check if 'userId', 'content', 'createdAt', 'updatedAt' exist before accessing
-                user_id = comment.get('userId')
-                content = comment.get('content')
-                created_at = comment.get('createdAt')
-                updated_at = comment.get('updatedAt') # Assuming updated_at can be same as created_at for dummy data
-
-                if user_id and content and created_at: # Ensure essential fields exist
-                    sql_statements.append(f"INSERT INTO comments (id, task_id, user_id, content, created_at, updated_at) VALUES ({escape_sql_string(comment['id'])}, {escape_sql_string(task['id'])}, {escape_sql_string(user_id)}, {escape_sql_string(content)}, {format_timestamp(created_at)}, {format_timestamp(updated_at)});")
-
-        # Insert royalties
-        for royalty in book.get('royalties', []):
-            sql_statements.append(f"INSERT INTO royalties (id, author_book_id, share_percentage, earnings, created_at, updated_at) VALUES ({escape_sql_string(royalty['id'])}, {escape_sql_string(royalty['authorBookId'])}, {royalty['sharePercentage']}, {royalty['earnings']}, {format_timestamp(book['createdAt'])}, {format_timestamp(book['updatedAt'])});")
-
-        # Insert launch plans
-        for lp in book.get('launchPlans', []):
-            promotion_channels_sql = f"ARRAY[{', '.join(escape_sql_string(channel) for channel in lp['promotionChannels'])}]" if lp.get('promotionChannels') else 'ARRAY[]::TEXT[]'
-            sql_statements.append(f"INSERT INTO launch_plans (id, author_book_id, launch_date, status, marketing_budget, promotion_channels, notes, created_at, updated_at) VALUES ({escape_sql_string(lp['id'])}, {escape_sql_string(lp['authorBookId'])}, {format_timestamp(lp['launchDate'])}, {escape_sql_string(lp['status'])}, {lp['marketingBudget']}, {promotion_channels_sql}, {escape_sql_string(lp['notes'])}, {format_timestamp(book['createdAt'])}, {format_timestamp(book['updatedAt'])});")
-
-# Write SQL statements to a file with UTF-8 encoding
-output_file_name = "insert_dummy_data.sql"
-with open(output_file_name, "w", encoding="utf-8") as f:
-    for statement in sql_statements:
-        f.write(statement + "\n")
-
-print(f"SQL insert statements written to {output_file_name}")
\ No newline at end of file
+def format_jsonb(value):
+    # Escape single quotes within the JSON string for the SQL literal
+    escaped_json = json.dumps(value).replace("'", "''")
+    return f"'{escaped_json}'::jsonb"
+
+def format_text_array(values):
+    if not values:
+        return 'ARRAY[]::TEXT[]'
+    return f"ARRAY[{', '.join(escape_sql_string(v) for v in values)}]"
+
+# Column layout of every table we emit, in foreign-key load order. Emitters
+# yield (table, row) pairs where row is a tuple of raw values in this order.
+TABLES = {
+    "users": (("id", "text"), ("name", "text"), ("email", "text"), ("image", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "workspaces": (("id", "text"), ("name", "text"), ("slug", "text"), ("description", "text"), ("settings", "jsonb"), ("owner_id", "text"), ("image_url", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "workspace_members": (("id", "text"), ("user_id", "text"), ("workspace_id", "text"), ("role", "text"), ("message", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "books": (("id", "text"), ("workspace_id", "text"), ("name", "text"), ("description", "text"), ("priority", "text"), ("status", "text"), ("type", "text"), ("start_date", "timestamp"), ("end_date", "timestamp"), ("team_lead", "text"), ("progress", "int"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "book_members": (("id", "text"), ("user_id", "text"), ("book_id", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "publishing_stages": (("id", "text"), ("author_book_id", "text"), ("name", "text"), ("description", "text"), ("order", "int"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "tasks": (("id", "text"), ("book_id", "text"), ("publishing_stage_id", "text"), ("title", "text"), ("description", "text"), ("status", "text"), ("type", "text"), ("priority", "text"), ("assignee_id", "text"), ("due_date", "timestamp"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "comments": (("id", "text"), ("task_id", "text"), ("user_id", "text"), ("content", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "royalties": (("id", "text"), ("author_book_id", "text"), ("share_percentage", "float"), ("earnings", "float"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    "launch_plans": (("id", "text"), ("author_book_id", "text"), ("launch_date", "timestamp"), ("status", "text"), ("marketing_budget", "float"), ("promotion_channels", "text[]"), ("notes", "text"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+    # Dashboard rollups, only emitted with --rollups (see rollup_rows).
+    "book_stats": (("id", "text"), ("workspace_id", "text"), ("total_tasks", "int"), ("tasks_by_status", "jsonb"), ("tasks_by_type", "jsonb"), ("tasks_by_priority", "jsonb"), ("due_buckets", "jsonb"), ("royalty_count", "int"), ("royalty_earnings", "float"), ("as_of", "timestamp")),
+    "workspace_stats": (("id", "text"), ("book_count", "int"), ("books_by_status", "jsonb"), ("total_tasks", "int"), ("tasks_by_status", "jsonb"), ("tasks_by_type", "jsonb"), ("tasks_by_priority", "jsonb"), ("due_buckets", "jsonb"), ("royalty_count", "int"), ("royalty_earnings", "float"), ("as_of", "timestamp")),
+}
+
+# The Prisma models behind each table. schema.prisma still uses the older
+# AuthorProject/ProjectMember/AuthorTask names and camelCase fields, so
+# columns map to the field declaring @map("<column>"), else the field of the
+# same name, else its camelCase form, else the explicit rename listed here.
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "assets", "schema.prisma")
+
+TABLE_MODELS = {
+    "users": ("User", {}),
+    "workspaces": ("Workspace", {}),
+    "workspace_members": ("WorkspaceMember", {}),
+    "books": ("AuthorProject", {}),
+    "book_members": ("ProjectMember", {"book_id": "projectId"}),
+    "publishing_stages": ("PublishingStage", {"author_book_id": "authorProjectId"}),
+    "tasks": ("AuthorTask", {"book_id": "projectId"}),
+    "comments": ("Comment", {}),
+    "royalties": ("Royalty", {"author_book_id": "authorProjectId"}),
+    "launch_plans": ("LaunchPlan", {"author_book_id": "authorProjectId"}),
+    "book_stats": ("BookStats", {}),
+    "workspace_stats": ("WorkspaceStats", {}),
+}
+
+PRISMA_KINDS = {"String": "text", "DateTime": "timestamp", "Int": "int", "Float": "float", "Json": "jsonb"}
+
+PrismaField = namedtuple("PrismaField", "name type optional is_list attributes")
+PrismaModel = namedtuple("PrismaModel", "name fields block_attributes")
+
+def parse_prisma_schema(path=SCHEMA_PATH):
+    # Returns ({model name: PrismaModel}, {enum name, ...}).
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    models = {}
+    enums = set()
+    for kind, name, body in re.findall(r"^(model|enum)\s+(\w+)\s*\{(.*?)^\}", text, re.M | re.S):
+        if kind == "enum":
+            enums.add(name)
+            continue
+        fields = {}
+        block_attributes = []
+        for line in body.splitlines():
+            line = line.split("//", 1)[0].strip()
+            if line.startswith("@@"):
+                block_attributes.append(line)
+            elif m := re.match(r"(\w+)\s+(\w+)(\[\])?(\?)?\s*(.*)", line):
+                fields[m[1]] = PrismaField(m[1], m[2], bool(m[4]), bool(m[3]), m[5])
+        models[name] = PrismaModel(name, fields, tuple(block_attributes))
+    return models, enums
+
+def model_field(models, table, column):
+    model_name, renames = TABLE_MODELS[table]
+    fields = models[model_name].fields
+    for field in fields.values():
+        if f'@map("{column}")' in field.attributes:
+            return field
+    camel = re.sub(r"_(\w)", lambda m: m[1].upper(), column)
+    for name in (renames.get(column), column, camel):
+        if name in fields:
+            return fields[name]
+    return None
+
+def schema_mismatches(models, enums):
+    # Returns (errors, warnings): column kinds that disagree with the Prisma
+    # field type, and columns with no Prisma field at all.
+    errors = []
+    warnings = []
+    for table, columns in TABLES.items():
+        model_name = TABLE_MODELS[table][0]
+        for column, kind in columns:
+            field = model_field(models, table, column)
+            if field is None:
+                warnings.append(f"{table}.{column}: no field in model {model_name}")
+                continue
+            expected = "text" if field.type in enums else PRISMA_KINDS.get(field.type)
+            if field.is_list and expected:
+                expected += "[]"
+            if expected != kind:
+                errors.append(f"{table}.{column}: declared {kind}, but {model_name}.{field.name} is {field.type}{'[]' if field.is_list else ''}")
+    return errors, warnings
+
+RESERVED_COLUMNS = {"order"}
+
+def quote_column(name):
+    return f'"{name}"' if name in RESERVED_COLUMNS else name
+
+INSERT_PREFIXES = {
+    table: f"INSERT INTO {table} ({', '.join(quote_column(name) for name, _ in columns)}) VALUES "
+    for table, columns in TABLES.items()
+}
+
+def format_values(table, row, dialect="postgres"):
+    return VALUE_ENCODERS[dialect][table](row)
+
+def format_insert(table, row, dialect="postgres"):
+    return f"{INSERT_PREFIXES[table]}{format_values(table, row, dialect)};"
+
+# COPY ... FROM STDIN text format: tab separated, \N for NULL, and backslash
+# escapes for the characters that would otherwise end a field or a row.
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+# None is written the way the INSERT format writes it: a jsonb null and an
+# empty array, not SQL NULL, so every format loads the same rows.
+def copy_jsonb(value):
+    return json.dumps(value).translate(COPY_ESCAPES)
+
+def copy_text_array(values):
+    if not values:
+        return '{}'
+    elements = []
+    for v in values:
+        if v is None:
+            elements.append('NULL')
+        else:
+            elements.append('"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"')
+    return ("{" + ",".join(elements) + "}").translate(COPY_ESCAPES)
+
+COPY_HEADERS = {
+    table: f"COPY {table} ({', '.join(quote_column(name) for name, _ in columns)}) FROM STDIN;\n"
+    for table, columns in TABLES.items()
+}
+
+# Binary COPY format: signature, flags and header-extension length, then per
+# row an int16 field count followed by int32-length-prefixed field values.
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+PGCOPY_NULL = struct.pack(">i", -1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+TEXT_OID = 25
+
+def pgcopy_text(s):
+    data = str(s).encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+@lru_cache(maxsize=4096)
+def pg_epoch_days(day):
+    return (date.fromisoformat(day) - PG_EPOCH.date()).days
+
+def pgcopy_timestamp(ts):
+    # int64 microseconds since 2000-01-01; naive values are taken as UTC.
+    # The JavaScript toISOString() shape (2025-10-06T11:04:03.485Z) that all
+    # of our data uses is decoded by slicing; anything else goes through
+    # datetime.fromisoformat.
+    if len(ts) == 24 and ts[10] == "T" and ts[19] == "." and ts[23] == "Z":
+        seconds = pg_epoch_days(ts[:10]) * 86400 + int(ts[11:13]) * 3600 + int(ts[14:16]) * 60 + int(ts[17:19])
+        return struct.pack(">iq", 8, (seconds * 1000 + int(ts[20:23])) * 1000)
+    dt = datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return struct.pack(">iq", 8, (dt - PG_EPOCH) // timedelta(microseconds=1))
+
+def pgcopy_jsonb(value):
+    # jsonb binary input is a version byte (1) followed by the JSON text.
+    data = b"\x01" + json.dumps(value).encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+def pgcopy_text_array(values):
+    if not values:
+        data = struct.pack(">iii", 0, 0, TEXT_OID)
+    else:
+        has_null = any(v is None for v in values)
+        parts = [struct.pack(">iiiii", 1, has_null, TEXT_OID, len(values), 1)]
+        parts.extend(PGCOPY_NULL if v is None else pgcopy_text(v) for v in values)
+        data = b"".join(parts)
+    return struct.pack(">i", len(data)) + data
+
+PGCOPY_FIELD_COUNTS = {table: struct.pack(">h", len(columns)) for table, columns in TABLES.items()}
+
+# Compiled row encoders. For every table and output format a specialised
+# function is generated once at import time from TABLES: the row is unpacked
+# into locals and each column is encoded by an inline, type-specific
+# expression, so there is no per-value dispatch or helper call on the common
+# text, timestamp and numeric paths. {v} in a template is the column local.
+STR = "({v} if {v}.__class__ is str else str({v}))"
+
+INSERT_EXPRESSIONS = {
+    "text": "'NULL' if {v} is None else \"'\" + " + STR + ".replace(\"'\", \"''\") + \"'\"",
+    "timestamp": "'NULL' if {v} is None else \"'\" + " + STR + " + \"'\"",
+    "int": "'NULL' if {v} is None else str({v})",
+    "float": "'NULL' if {v} is None else str({v})",
+    "jsonb": "format_jsonb({v})",
+    "text[]": "format_text_array({v})",
+}
+
+# SQLite has no jsonb or array types; both are stored as JSON text.
+SQLITE_INSERT_EXPRESSIONS = {
+    **INSERT_EXPRESSIONS,
+    "jsonb": "'NULL' if {v} is None else \"'\" + json.dumps({v}).replace(\"'\", \"''\") + \"'\"",
+    "text[]": "\"'\" + json.dumps({v} or []).replace(\"'\", \"''\") + \"'\"",
+}
+
+DIALECT_INSERT_EXPRESSIONS = {
+    "postgres": INSERT_EXPRESSIONS,
+    "sqlite": SQLITE_INSERT_EXPRESSIONS,
+}
+
+COPY_EXPRESSIONS = {
+    "text": "'\\\\N' if {v} is None else (_s.translate(COPY_ESCAPES) if '\\\\' in (_s := " + STR + ") or '\\t' in _s or '\\n' in _s or '\\r' in _s else _s)",
+    "int": "'\\\\N' if {v} is None else str({v})",
+    "float": "'\\\\N' if {v} is None else str({v})",
+    "jsonb": "copy_jsonb({v})",
+    "text[]": "copy_text_array({v})",
+}
+COPY_EXPRESSIONS["timestamp"] = COPY_EXPRESSIONS["text"]
+
+PGCOPY_EXPRESSIONS = {
+    "text": "PGCOPY_NULL if {v} is None else _length(len(_b := " + STR + ".encode('utf-8'))) + _b",
+    "timestamp": "PGCOPY_NULL if {v} is None else pgcopy_timestamp({v})",
+    "int": "PGCOPY_NULL if {v} is None else _int4(4, {v})",
+    "float": "PGCOPY_NULL if {v} is None else _float8(8, {v})",
+    # As in the text formats, None is a jsonb null and an empty array.
+    "jsonb": "pgcopy_jsonb({v})",
+    "text[]": "pgcopy_text_array({v})",
+}
+
+# Literal caches. Foreign keys, enum values and timestamps repeat across
+# many rows, so for those columns the encoded literal is memoized in a
+# bounded LRU cache (functools.lru_cache, typed so that 1, 1.0 and True stay
+# apart) and reused instead of being converted again. Primary keys and free
+# text are nearly always unique and bypass the caches. Only the binary
+# encoders are cached: the text formats' inline quoting of a short string
+# costs no more than a cache lookup, while a PGCOPY timestamp is ten times
+# that.
+LITERAL_CACHE_SIZE = 1 << 16
+
+LITERAL_CACHES = {
+    name: lru_cache(maxsize=LITERAL_CACHE_SIZE, typed=True)(encoder)
+    for name, encoder in (("pgcopy_text", pgcopy_text), ("pgcopy_timestamp", pgcopy_timestamp))
+}
+
+CACHED_PGCOPY_EXPRESSIONS = {
+    "text": "PGCOPY_NULL if {v} is None else cached_pgcopy_text({v})",
+    "timestamp": "PGCOPY_NULL if {v} is None else cached_pgcopy_timestamp({v})",
+}
+
+ENUM_COLUMNS = {"role", "priority", "status", "type"}
+
+def is_repeated_column(name, kind):
+    return kind == "timestamp" or (kind == "text" and (name.endswith("_id") or name == "team_lead" or name in ENUM_COLUMNS))
+
+def literal_cache_stats():
+    return {name: cache.cache_info()._asdict() for name, cache in LITERAL_CACHES.items()}
+
+def compile_row_encoder(name, columns, expressions, result, cached_expressions=None):
+    # result is the return expression over the encoded fields f0..fN.
+    names = [f"c{i}" for i in range(len(columns))]
+    lines = [f"def {name}(row):", f"    {', '.join(names)}, = row"]
+    for i, (column, kind) in enumerate(columns):
+        if cached_expressions and kind in cached_expressions and is_repeated_column(column, kind):
+            expression = cached_expressions[kind]
+        else:
+            expression = expressions[kind]
+        lines.append(f"    f{i} = " + expression.format(v=names[i]))
+    lines.append(f"    return {result}")
+    namespace = {
+        **{f"cached_{name}": cache for name, cache in LITERAL_CACHES.items()},
+        "json": json, "COPY_ESCAPES": COPY_ESCAPES, "PGCOPY_NULL": PGCOPY_NULL,
+        "format_jsonb": format_jsonb, "format_text_array": format_text_array,
+        "copy_jsonb": copy_jsonb, "copy_text_array": copy_text_array,
+        "pgcopy_timestamp": pgcopy_timestamp, "pgcopy_jsonb": pgcopy_jsonb, "pgcopy_text_array": pgcopy_text_array,
+        "_length": struct.Struct(">i").pack, "_int4": struct.Struct(">ii").pack, "_float8": struct.Struct(">id").pack,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace[name]
+
+def compile_table_encoders(table, columns):
+    n = len(columns)
+    values = {
+        dialect: compile_row_encoder(f"encode_{table}_{dialect}_values", columns, expressions,
+                                     'f"(' + ", ".join(f"{{f{i}}}" for i in range(n)) + ')"')
+        for dialect, expressions in DIALECT_INSERT_EXPRESSIONS.items()
+    }
+    copy_row = compile_row_encoder(f"encode_{table}_copy", columns, COPY_EXPRESSIONS,
+                                   'f"' + "\\t".join(f"{{f{i}}}" for i in range(n)) + '"')
+    pgcopy_row = compile_row_encoder(f"encode_{table}_pgcopy", columns, PGCOPY_EXPRESSIONS,
+                                     f"b''.join(({PGCOPY_FIELD_COUNTS[table]!r}, " + ", ".join(f"f{i}" for i in range(n)) + "))",
+                                     CACHED_PGCOPY_EXPRESSIONS)
+    return values, copy_row, pgcopy_row
+
+VALUE_ENCODERS = {dialect: {} for dialect in DIALECT_INSERT_EXPRESSIONS}
+COPY_ROW_ENCODERS = {}
+PGCOPY_ROW_ENCODERS = {}
+for _table, _columns in TABLES.items():
+    _values, COPY_ROW_ENCODERS[_table], PGCOPY_ROW_ENCODERS[_table] = compile_table_encoders(_table, _columns)
+    for _dialect, _encoder in _values.items():
+        VALUE_ENCODERS[_dialect][_table] = _encoder
+
+# Direct SQLite loading binds raw values as statement parameters; only the
+# column kinds SQLite has no type for are adapted, to the same JSON text the
+# sqlite dialect writes.
+SQLITE_TYPES = {"text": "TEXT", "timestamp": "TEXT", "int": "INTEGER", "float": "REAL", "jsonb": "TEXT", "text[]": "TEXT"}
+SQLITE_ADAPTERS = {
+    "jsonb": lambda value: None if value is None else json.dumps(value),
+    "text[]": lambda values: json.dumps(values or []),
+}
+
+SQLITE_INSERTS = {
+    table: f"{INSERT_PREFIXES[table]}({', '.join('?' * len(columns))})"
+    for table, columns in TABLES.items()
+}
+
+SQLITE_ADAPTED_COLUMNS = {
+    table: tuple((i, SQLITE_ADAPTERS[kind]) for i, (_, kind) in enumerate(columns) if kind in SQLITE_ADAPTERS)
+    for table, columns in TABLES.items()
+}
+
+def sqlite_params(table, row):
+    adapted = SQLITE_ADAPTED_COLUMNS[table]
+    if not adapted:
+        return row
+    row = list(row)
+    for i, adapt in adapted:
+        row[i] = adapt(row[i])
+    return row
+
+def sqlite_ddl(tables=TABLES):
+    for table in tables:
+        columns = TABLES[table]
+        column_defs = ", ".join(
+            f"{quote_column(name)} {SQLITE_TYPES[kind]}{' PRIMARY KEY' if name == 'id' else ''}" for name, kind in columns
+        )
+        yield f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})"
+
+# The rollup tables are not part of the application's existing schema, so
+# output that carries them (--rollups) creates them first. Their foreign keys
+# come from the BookStats/WorkspaceStats relations in the Prisma schema.
+ROLLUP_TABLES = ("book_stats", "workspace_stats")
+POSTGRES_TYPES = {"text": "TEXT", "timestamp": "TIMESTAMP(3)", "int": "INTEGER", "float": "DOUBLE PRECISION", "jsonb": "JSONB", "text[]": "TEXT[]"}
+
+def postgres_ddl(tables, schema_path=SCHEMA_PATH):
+    models = parse_prisma_schema(schema_path)[0]
+    foreign_keys = integrity_rules(models)[0]
+    for table in tables:
+        column_defs = []
+        for name, kind in TABLES[table]:
+            field = model_field(models, table, name)
+            constraint = "PRIMARY KEY" if name == "id" else "NULL" if field is None or field.optional else "NOT NULL"
+            column_defs.append(f"{quote_column(name)} {POSTGRES_TYPES[kind]} {constraint}")
+        column_defs.extend(f"FOREIGN KEY ({', '.join(columns)}) REFERENCES {ref} (id) ON DELETE CASCADE"
+                           for columns, ref, _ in foreign_keys[table])
+        yield f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(column_defs)})"
+
+def rollup_ddl(dialect="postgres"):
+    statements = sqlite_ddl(ROLLUP_TABLES) if dialect == "sqlite" else postgres_ddl(ROLLUP_TABLES)
+    return "".join(f"{statement};\n" for statement in statements)
+
+# Normalized records. Nested copies of users are replaced by user ids that
+# are joined against one interned user table, ids and enum values are
+# interned, and each record is a tuple subclass without a per-instance dict.
+# Leading fields follow the TABLES column order so rows are slices.
+User = namedtuple("User", "id name email image created_at updated_at")
+Workspace = namedtuple("Workspace", "id name slug description settings owner_id image_url created_at updated_at members books")
+WorkspaceMember = namedtuple("WorkspaceMember", "id user_id workspace_id role message")
+Book = namedtuple("Book", "id workspace_id name description priority status type start_date end_date team_lead progress created_at updated_at "
+                          "members stages tasks royalties launch_plans")
+BookMember = namedtuple("BookMember", "id user_id book_id")
+PublishingStage = namedtuple("PublishingStage", "id book_id name description order")
+Task = namedtuple("Task", "id book_id publishing_stage_id title description status type priority assignee_id due_date created_at updated_at comments")
+Comment = namedtuple("Comment", "id task_id user_id content created_at updated_at")
+Royalty = namedtuple("Royalty", "id book_id share_percentage earnings")
+LaunchPlan = namedtuple("LaunchPlan", "id book_id launch_date status marketing_budget promotion_channels notes")
+
+def intern(s):
+    return None if s is None else sys.intern(s)
+
+class RecordStore:
+    """Interned, normalized model of parsed users and workspaces.
+
+    Only ``users`` is kept, since member rows read their timestamps from it;
+    workspaces are normalized one at a time with normalize_workspace() and
+    streamed on.
+    """
+
+    def __init__(self):
+        self.users = {}
+
+    def add_user(self, user):
+        record = User(intern(user['id']), user['name'], user['email'], user['image'], intern(user['createdAt']), intern(user['updatedAt']))
+        self.users[record.id] = record
+        return record
+
+    def user_id(self, ref):
+        # Nested user copies are only consulted when the user is missing from
+        # the top-level list.
+        user_id = intern(ref['userId'])
+        if user_id not in self.users and ref.get('user'):
+            self.add_user(ref['user'])
+        return user_id
+
+    def normalize_workspace(self, ws):
+        members = tuple(WorkspaceMember(intern(m['id']), self.user_id(m), intern(m['workspaceId']), intern(m['role']), m['message'])
+                        for m in ws.get('members', []))
+        books = tuple(self.normalize_book(book) for book in ws.get('books', []))
+        return Workspace(intern(ws['id']), ws['name'], ws['slug'], ws['description'], ws['settings'], intern(ws['ownerId']), ws['image_url'],
+                         intern(ws['createdAt']), intern(ws['updatedAt']), members, books)
+
+    def normalize_book(self, book):
+        book_id = intern(book['id'])
+        members = tuple(BookMember(intern(m['id']), self.user_id(m), intern(m['bookId'])) for m in book.get('members', []))
+        stages = tuple(PublishingStage(intern(st['id']), intern(st['authorBookId']), st['name'], st['description'], st['order'])
+                       for st in book.get('publishingStages', []))
+        tasks = tuple(self.normalize_task(task) for task in book.get('tasks', []))
+        royalties = tuple(Royalty(intern(r['id']), intern(r['authorBookId']), r['sharePercentage'], r['earnings'])
+                          for r in book.get('royalties', []))
+        launch_plans = tuple(LaunchPlan(intern(lp['id']), intern(lp['authorBookId']), lp['launchDate'], intern(lp['status']), lp['marketingBudget'],
+                                        lp.get('promotionChannels'), lp['notes'])
+                             for lp in book.get('launchPlans', []))
+        return Book(book_id, intern(book['workspaceId']), book['name'], book['description'], intern(book['priority']), intern(book['status']),
+                    intern(book['type']), book['start_date'], book['end_date'], intern(book['team_lead']), book['progress'],
+                    intern(book['createdAt']), intern(book['updatedAt']), members, stages, tasks, royalties, launch_plans)
+
+    def normalize_task(self, task):
+        task_id = intern(task['id'])
+        comments = tuple(Comment(intern(c.get('id')), task_id, intern(c.get('userId')), c.get('content'), c.get('createdAt'), c.get('updatedAt'))
+                         for c in task.get('comments', []))
+        return Task(task_id, intern(task['bookId']), intern(task.get('publishingStageId')), task['title'], task['description'],
+                    intern(task['status']), intern(task['type']), intern(task['priority']), intern(task['assigneeId']), task['due_date'],
+                    intern(task['createdAt']), intern(task['updatedAt']), comments)
+
+    def member_users(self, ws):
+        # The slice of the user table a workspace's member rows join against.
+        user_ids = {m.user_id for m in ws.members}
+        user_ids.update(m.user_id for book in ws.books for m in book.members)
+        return {user_id: self.users[user_id] for user_id in user_ids}
+
+def emit_users(users):
+    for user in users:
+        yield "users", tuple(user)
+
+def emit_workspace(ws):
+    yield "workspaces", ws[:9]
+
+def emit_workspace_members(ws, users):
+    for member in ws.members:
+        user = users[member.user_id]
+        yield "workspace_members", (*member, user.created_at, user.updated_at)
+
+def emit_book(book):
+    yield "books", book[:13]
+
+def emit_book_members(book, users):
+    for member in book.members:
+        user = users[member.user_id]
+        yield "book_members", (*member, user.created_at, user.updated_at)
+
+def emit_publishing_stages(book):
+    for stage in book.stages:
+        yield "publishing_stages", (*stage, book.created_at, book.updated_at)
+
+def emit_tasks(book):
+    for task in book.tasks:
+        yield "tasks", task[:12]
+        yield from emit_comments(task)
+
+def comment_is_complete(comment):
+    # Comments without a user, content or creation time are skipped
+    return bool(comment.user_id and comment.content and comment.created_at)
+
+def emit_comments(task):
+    for comment in task.comments:
+        if comment_is_complete(comment):
+            yield "comments", tuple(comment)
+
+def emit_royalties(book):
+    for royalty in book.royalties:
+        yield "royalties", (*royalty, book.created_at, book.updated_at)
+
+def emit_launch_plans(book):
+    for lp in book.launch_plans:
+        yield "launch_plans", (*lp, book.created_at, book.updated_at)
+
+def iter_workspace_rows(ws, users):
+    yield from emit_workspace(ws)
+    yield from emit_workspace_members(ws, users)
+    for book in ws.books:
+        yield from emit_book(book)
+        yield from emit_book_members(book, users)
+        yield from emit_publishing_stages(book)
+        yield from emit_tasks(book)
+        yield from emit_royalties(book)
+        yield from emit_launch_plans(book)
+
+def record_shards(records, store=None, users_per_shard=10000):
+    # Shards are (function, args, kwargs) triples naming a module-level row
+    # generator, so they can be shipped to worker processes by reference.
+    # Each workspace is one shard, carrying only the users its members join
+    # against; users are grouped into blocks.
+    store = RecordStore() if store is None else store
+    users = []
+    seen_workspace = False
+    for kind, obj in records:
+        if kind == "user":
+            if seen_workspace:
+                raise ValueError("users must come before workspaces in the input")
+            users.append(store.add_user(obj))
+            if len(users) >= users_per_shard:
+                yield emit_users, (users,), {}
+                users = []
+        else:
+            if users:
+                yield emit_users, (users,), {}
+                users = []
+            seen_workspace = True
+            ws = store.normalize_workspace(obj)
+            yield iter_workspace_rows, (ws, store.member_users(ws)), {}
+    if users:
+        yield emit_users, (users,), {}
+
+# Parsed-input snapshots. The normalized shards of an input are pickled to
+# <cache dir>/<key>.pickle, each shard as a frame of its own: an 8-byte
+# length followed by an independent pickle. A pickler or unpickler shared
+# across shards would keep every shard alive through its memo, so frames
+# hold memory to one shard at a time, like the parse they replace. The key
+# hashes the input bytes, the input format and this script itself, so any
+# change to either parses afresh. A warm run reads and unpickles the
+# shards one frame at a time instead of parsing.
+SNAPSHOT_KEEP = 8
+SNAPSHOT_FRAME = struct.Struct(">Q")
+
+def snapshot_key(path, input_format):
+    digest = hashlib.blake2b(digest_size=20)
+    # Pickles name their classes and functions by module, so a snapshot
+    # written by the script is not reused by an importer and vice versa.
+    digest.update(f"{__name__}\0{input_format}\0".encode("utf-8"))
+    with open(os.path.abspath(__file__), "rb") as f:
+        digest.update(f.read())
+    if path is None:
+        digest.update(dummy_data.encode("utf-8"))
+    else:
+        with open(path, "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+    return digest.hexdigest()
+
+def load_snapshot(path):
+    with open(path, "rb") as f:
+        while header := f.read(SNAPSHOT_FRAME.size):
+            (length,) = SNAPSHOT_FRAME.unpack(header)
+            yield pickle.loads(f.read(length))
+
+def save_snapshot(shards, path):
+    # Passes shards through while pickling them; the snapshot only appears
+    # under its final name once the input has been read to the end.
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for shard in shards:
+                frame = pickle.dumps(shard, pickle.HIGHEST_PROTOCOL)
+                f.write(SNAPSHOT_FRAME.pack(len(frame)))
+                f.write(frame)
+                yield shard
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    snapshots = sorted((entry for entry in os.scandir(directory) if entry.name.endswith(".pickle")),
+                       key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in snapshots[SNAPSHOT_KEEP:]:
+        os.remove(entry.path)
+
+def snapshot_shards(records, input_path, input_format, cache_dir):
+    path = os.path.join(cache_dir, snapshot_key(input_path, input_format) + ".pickle")
+    if os.path.exists(path):
+        os.utime(path)
+        return load_snapshot(path)
+    return save_snapshot(record_shards(records), path)
+
+# Referential integrity. Foreign keys and unique keys come from the Prisma
+# schema; on top of those a few cross-row rules the database cannot express
+# are checked. Every rule is a hash lookup per row, and references to rows
+# not seen yet are kept aside and resolved once the stream ends, so a
+# validation pass is O(n) in time and only holds ids and keys.
+COLUMN_INDEXES = {table: {name: i for i, (name, _) in enumerate(columns)} for table, columns in TABLES.items()}
+
+def integrity_rules(models):
+    # Returns ({table: ((columns, ref_table, optional), ...)},
+    #          {table: (columns, ...)}, warnings) with column names as in TABLES.
+    model_tables = {model: table for table, (model, _) in TABLE_MODELS.items()}
+    foreign_keys = {table: [] for table in TABLES}
+    unique_keys = {table: [] for table in TABLES}
+    warnings = []
+    for table, (model_name, _) in TABLE_MODELS.items():
+        model = models[model_name]
+        field_columns = {}
+        for column, _ in TABLES[table]:
+            field = model_field(models, table, column)
+            if field is not None:
+                field_columns[field.name] = column
+        def columns_of(names):
+            names = [name.strip() for name in names.split(",")]
+            if all(name in field_columns for name in names):
+                return tuple(field_columns[name] for name in names)
+            return None
+        for field in model.fields.values():
+            if re.search(r"@(id|unique)\b", field.attributes) and field.name in field_columns:
+                unique_keys[table].append((field_columns[field.name],))
+            relation = re.search(r"@relation\(.*?fields:\s*\[([^\]]*)\].*?references:\s*\[([^\]]*)\]", field.attributes)
+            if relation is None:
+                continue
+            columns = columns_of(relation[1])
+            if columns is None:
+                continue
+            if field.type not in model_tables:
+                # Fall back to the <singular>_id column naming convention.
+                guess = f"{columns[0][:-3]}s" if len(columns) == 1 and columns[0].endswith("_id") else None
+                if guess not in TABLES:
+                    warnings.append(f"{table}.{', '.join(columns)}: relation to unknown model {field.type} is not checked")
+                    continue
+                warnings.append(f"{table}.{', '.join(columns)}: relation to unknown model {field.type}, assuming {guess}")
+                model_tables[field.type] = guess
+            if relation[2].strip() != "id":
+                warnings.append(f"{table}.{', '.join(columns)}: relation to {field.type}.{relation[2].strip()} is not checked")
+                continue
+            foreign_keys[table].append((columns, model_tables[field.type], field.optional))
+        for attribute in model.block_attributes:
+            if block := re.match(r"@@(?:id|unique)\(\s*\[([^\]]*)\]", attribute):
+                columns = columns_of(block[1])
+                if columns is not None:
+                    unique_keys[table].append(columns)
+    return foreign_keys, unique_keys, warnings
+
+class IntegrityValidator:
+    """Single-pass checker for a stream of (table, row) pairs.
+
+    check(rows) feeds rows through; finish() resolves forward references and
+    returns {rule: (count, example ids)}.
+    """
+
+    def __init__(self, foreign_keys, unique_keys, max_examples=5):
+        self.max_examples = max_examples
+        self.violations = {}
+        self.ids = {table: set() for table in TABLES}
+        self.pending = []
+        self.foreign_keys = {
+            table: [(columns[0], COLUMN_INDEXES[table][columns[0]], ref, optional)
+                    for columns, ref, optional in fks if len(columns) == 1]
+            for table, fks in foreign_keys.items()
+        }
+        self.unique_keys = {
+            table: [(f"{table}({', '.join(columns)}) is not unique", tuple(COLUMN_INDEXES[table][c] for c in columns), set())
+                    for columns in keys if columns != ("id",)]
+            for table, keys in unique_keys.items()
+        }
+        # Cross-row rules: a task's stage must belong to the task's book, and
+        # its assignee must be a member of that book.
+        self.stage_books = {}
+        self.book_members = set()
+        index = COLUMN_INDEXES
+        self.member_columns = (index["book_members"]["user_id"], index["book_members"]["book_id"])
+        self.stage_book_column = index["publishing_stages"]["author_book_id"]
+        self.task_columns = (index["tasks"]["book_id"], index["tasks"]["publishing_stage_id"], index["tasks"]["assignee_id"])
+
+    def violation(self, rule, row_id):
+        count, examples = self.violations.get(rule, (0, []))
+        if len(examples) < self.max_examples:
+            examples.append(row_id)
+        self.violations[rule] = (count + 1, examples)
+
+    def check(self, rows):
+        ids = self.ids
+        for table, row in rows:
+            row_id = row[0]
+            table_ids = ids[table]
+            if row_id in table_ids:
+                self.violation(f"{table}.id is not unique", row_id)
+            table_ids.add(row_id)
+            for column, i, ref, optional in self.foreign_keys[table]:
+                value = row[i]
+                if value is None:
+                    if not optional:
+                        self.violation(f"{table}.{column} is null", row_id)
+                elif value not in ids[ref]:
+                    self.pending.append((table, column, ref, value, row_id))
+            for rule, columns, seen in self.unique_keys[table]:
+                key = tuple(row[i] for i in columns)
+                if None in key:
+                    continue
+                if key in seen:
+                    self.violation(rule, row_id)
+                seen.add(key)
+            if table == "book_members":
+                self.book_members.add((row[self.member_columns[0]], row[self.member_columns[1]]))
+            elif table == "publishing_stages":
+                self.stage_books[row_id] = row[self.stage_book_column]
+            elif table == "tasks":
+                book, stage, assignee = (row[i] for i in self.task_columns)
+                self.pending.append(("tasks", None, None, (book, stage, assignee), row_id))
+
+    def finish(self):
+        ids = self.ids
+        for table, column, ref, value, row_id in self.pending:
+            if column is not None:
+                if value not in ids[ref]:
+                    self.violation(f"{table}.{column} references a missing {ref}.id", row_id)
+                continue
+            book, stage, assignee = value
+            if stage is not None and stage in self.stage_books and self.stage_books[stage] != book:
+                self.violation("tasks.publishing_stage_id belongs to a different book", row_id)
+            if assignee is not None and (assignee, book) not in self.book_members:
+                self.violation("tasks.assignee_id is not a member of the task's book", row_id)
+        self.pending.clear()
+        return self.violations
+
+class LenientUsers:
+    # Member rows join user timestamps from the user table; when validating,
+    # a member whose user is missing yields a row instead of a KeyError so
+    # the dangling reference can be reported.
+    MISSING = User(None, None, None, None, None, None)
+
+    def __init__(self, users):
+        self.users = users
+
+    def __getitem__(self, user_id):
+        return self.users.get(user_id, self.MISSING)
+
+def validation_rows(records, validator):
+    # The rows record_shards() would produce, without failing on members
+    # whose user is missing; comments the emitter would skip are reported.
+    store = RecordStore()
+    users = LenientUsers(store.users)
+    for kind, obj in records:
+        if kind == "user":
+            yield from emit_users([store.add_user(obj)])
+            continue
+        ws = store.normalize_workspace(obj)
+        for book in ws.books:
+            for task in book.tasks:
+                for comment in task.comments:
+                    if not comment_is_complete(comment):
+                        validator.violation("comments skipped for a missing userId, content or createdAt", comment.id or task.id)
+        yield from iter_workspace_rows(ws, users)
+
+def format_violations(violations):
+    lines = [f"{sum(count for count, _ in violations.values())} integrity violation(s)"]
+    for rule, (count, examples) in sorted(violations.items(), key=lambda item: -item[1][0]):
+        lines.append(f"  {count:>8}  {rule} (e.g. {', '.join(map(str, examples))})")
+    return "\n".join(lines)
+
+# Knobs for the synthetic scale-out dataset. Counts are exact rather than
+# drawn, so every entity's global id follows from its position alone and any
+# workspace can be generated independently of the others.
+SYNTHETIC_DEFAULTS = {
+    "users": 1000,
+    "workspaces": 10,
+    "members_per_workspace": 20,
+    "books_per_workspace": 10,
+    "members_per_book": 5,
+    "stages_per_book": 5,
+    "tasks_per_book": 50,
+    "comments_per_task": 2,
+    "royalties_per_book": 2,
+    "launch_plans_per_book": 1,
+}
+
+SYNTHETIC_CHUNK = 10000
+
+FIRST_NAMES = ("Alex", "John", "Oliver", "Maya", "Priya", "Sam", "Lena", "Tariq", "Zanele", "Kenji", "Ana", "Noah")
+LAST_NAMES = ("Smith", "Warrel", "Watts", "Naidoo", "Khumalo", "Ito", "Garcia", "Botha", "Okafor", "Meyer", "Chen", "Silva")
+PROFILE_IMAGES = ("profile_img_a", "profile_img_j", "profile_img_o")
+TITLE_WORDS = ("Launch", "Draft", "Review", "Cover", "Chapter", "Index", "Proof", "Audio", "Print", "Metadata", "Blurb", "Edit")
+DESCRIPTIONS = (
+    "Initial review of the manuscript.",
+    "Copyediting, line editing, and proofreading.",
+    "Cover design and interior layout.",
+    "Promotional activities and launch campaigns.",
+    "Getting the book to retailers.",
+    None,
+)
+STAGE_NAMES = ("Manuscript Review", "Editing", "Design", "Marketing", "Distribution")
+COMMENT_TEXTS = ("Looks good to me.", "Can we move this to next week?", "Blocked on feedback.", "Done, please review.", "Updated the draft.")
+PROMOTION_CHANNELS = ("Social Media", "Email Marketing", "Press Release", "Author Website", "Book Tours", "Podcasts")
+PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+BOOK_STATUSES = ("ACTIVE", "PLANNING", "COMPLETED", "ON_HOLD", "CANCELLED")
+BOOK_TYPES = ("HYBRID", "ASSISTED")
+TASK_STATUSES = ("TODO", "IN_PROGRESS", "DONE")
+TASK_TYPES = ("TASK", "BUG", "FEATURE", "IMPROVEMENT", "OTHER", "MANUSCRIPT", "BOOK_DRAFT", "PUBLISHING_STAGE")
+LAUNCH_STATUSES = ("PLANNED", "IN_PROGRESS", "COMPLETED")
+
+def iso_timestamp(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+@lru_cache(maxsize=None)
+def synthetic_pools(seed):
+    # Timestamps are drawn from pre-formatted pools so that no per-row
+    # datetime arithmetic or strftime is needed.
+    rng = random.Random(f"{seed}:pools")
+    start = datetime(2025, 1, 1)
+    timestamps = tuple(sorted(iso_timestamp(start + timedelta(milliseconds=rng.randrange(300 * 86400 * 1000))) for _ in range(4096)))
+    due = datetime(2025, 10, 1)
+    dates = tuple(iso_timestamp(due + timedelta(days=d)) for d in range(270))
+    names = tuple(f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES)
+    titles = tuple(f"{a} {b}" for a in TITLE_WORDS for b in TITLE_WORDS if a != b)
+    return timestamps, dates, names, titles
+
+def synthetic_users(seed, start, stop):
+    timestamps, _, names, _ = synthetic_pools(seed)
+    rng = random.Random(f"{seed}:users:{start}")
+    n = stop - start
+    for i, name, image, ts in zip(range(start + 1, stop + 1), rng.choices(names, k=n), rng.choices(PROFILE_IMAGES, k=n), rng.choices(timestamps, k=n)):
+        yield "users", (f"user_{i}", name, f"user{i}@example.com", image, ts, ts)
+
+def synthetic_workspace(seed, ws_index, users, members_per_workspace, books_per_workspace, **knobs):
+    timestamps = synthetic_pools(seed)[0]
+    rng = random.Random(f"{seed}:workspace:{ws_index}")
+    ws_id = f"org_{ws_index + 1}"
+    member_ids = [f"user_{i + 1}" for i in rng.sample(range(users), min(members_per_workspace, users))]
+    created = rng.choice(timestamps)
+    yield "workspaces", (ws_id, f"Workspace {ws_index + 1}", f"workspace-{ws_index + 1}", None, {}, member_ids[0], "workspace_img_default", created, created)
+
+    n = len(member_ids)
+    roles = rng.choices(("ADMIN", "MEMBER"), weights=(1, 4), k=n)
+    roles[0] = "ADMIN"
+    base = ws_index * members_per_workspace
+    for i, user_id, role in zip(range(base + 1, base + n + 1), member_ids, roles):
+        yield "workspace_members", (f"wm_{i}", user_id, ws_id, role, "", created, created)
+
+    for b in range(books_per_workspace):
+        yield from synthetic_book(rng, seed, ws_id, ws_index * books_per_workspace + b, member_ids, **knobs)
+
+def synthetic_book(rng, seed, ws_id, book_index, ws_member_ids, members_per_book, stages_per_book, tasks_per_book,
+                   comments_per_task, royalties_per_book, launch_plans_per_book):
+    timestamps, dates, _, titles = synthetic_pools(seed)
+    choices = rng.choices
+    book_id = f"book_{book_index + 1}"
+    member_ids = rng.sample(ws_member_ids, min(members_per_book, len(ws_member_ids)))
+    created = rng.choice(timestamps)
+    start_date, end_date = sorted(choices(dates, k=2))
+    yield "books", (book_id, ws_id, rng.choice(titles), rng.choice(DESCRIPTIONS), rng.choice(PRIORITIES), rng.choice(BOOK_STATUSES),
+                    rng.choice(BOOK_TYPES), start_date, end_date, member_ids[0], rng.randrange(101), created, created)
+
+    base = book_index * members_per_book
+    for i, user_id in zip(range(base + 1, base + len(member_ids) + 1), member_ids):
+        yield "book_members", (f"bm_{i}", user_id, book_id, created, created)
+
+    base = book_index * stages_per_book
+    stage_ids = [f"ps_{i}" for i in range(base + 1, base + stages_per_book + 1)]
+    for order, stage_id in enumerate(stage_ids, 1):
+        yield "publishing_stages", (stage_id, book_id, STAGE_NAMES[(order - 1) % len(STAGE_NAMES)], rng.choice(DESCRIPTIONS), order, created, created)
+
+    n = tasks_per_book
+    base = book_index * n
+    task_ids = [f"task_{i}" for i in range(base + 1, base + n + 1)]
+    task_stages = choices(stage_ids, k=n) if stage_ids else [None] * n
+    task_created = choices(timestamps, k=n)
+    for row in zip(task_ids, [book_id] * n, task_stages, choices(titles, k=n), choices(DESCRIPTIONS, k=n),
+                   choices(TASK_STATUSES, k=n), choices(TASK_TYPES, k=n), choices(PRIORITIES, k=n),
+                   choices(member_ids, k=n), choices(dates, k=n), task_created, task_created):
+        yield "tasks", row
+
+    # Comments follow all of the book's tasks rather than each task, which
+    # keeps the foreign-key order intact while letting draws stay batched.
+    n = tasks_per_book * comments_per_task
+    base = book_index * n
+    comment_created = choices(timestamps, k=n)
+    comment_tasks = [task_id for task_id in task_ids for _ in range(comments_per_task)]
+    for i, task_id, user_id, content, ts in zip(range(base + 1, base + n + 1), comment_tasks, choices(member_ids, k=n), choices(COMMENT_TEXTS, k=n), comment_created):
+        yield "comments", (f"comment_{i}", task_id, user_id, content, ts, ts)
+
+    if royalties_per_book:
+        share = round(100 / royalties_per_book, 2)
+        base = book_index * royalties_per_book
+        for i in range(base + 1, base + royalties_per_book + 1):
+            yield "royalties", (f"roy_{i}", book_id, share, round(rng.random() * 5000, 2), created, created)
+
+    base = book_index * launch_plans_per_book
+    for i in range(base + 1, base + launch_plans_per_book + 1):
+        yield "launch_plans", (f"lp_{i}", book_id, rng.choice(dates), rng.choice(LAUNCH_STATUSES), rng.randrange(0, 10001, 250),
+                               rng.sample(PROMOTION_CHANNELS, 2), None, created, created)
+
+def synthetic_shards(seed=0, **knobs):
+    # Deterministic scale-out dataset with the same referential structure as
+    # dummy_data: workspace members are users, book members are workspace
+    # members, assignees and commenters are book members, and task stages
+    # belong to the task's own book.
+    knobs = {**SYNTHETIC_DEFAULTS, **knobs}
+    workspaces = knobs.pop("workspaces")
+    users = knobs["users"]
+    for start in range(0, users, SYNTHETIC_CHUNK):
+        yield synthetic_users, (seed, start, min(start + SYNTHETIC_CHUNK, users)), {}
+    for ws_index in range(workspaces):
+        yield synthetic_workspace, (seed, ws_index), knobs
+
+def shard_rows(shards):
+    for func, args, kwargs in shards:
+        yield from func(*args, **kwargs)
+
+# Dashboard rollups (--rollups). StatsGrid, BookAnalytics and TasksSummary
+# count tasks by status, type, priority and due date and sum royalties per
+# book and workspace; book_stats and workspace_stats hold those aggregates so
+# the API can serve them with a keyed lookup. They are accumulated while a
+# shard's rows stream past and emitted at the end of the shard, which works
+# because a workspace and everything under it always share one shard. Due
+# buckets only count open (not DONE) tasks, relative to the as-of time:
+# --rollup-as-of, or else the latest updated_at among the workspace, book,
+# task and royalty rows of the shard, so that the same input always gives
+# the same rollups (and --diff does not rewrite them on every run).
+DUE_BUCKETS = ("overdue", "due_7d", "due_30d", "later")
+DUE_BUCKET_DAYS = (0, 7, 30)
+# The as-of time of a shard without any updated_at.
+EPOCH_TIMESTAMP = "1970-01-01T00:00:00.000Z"
+
+def utc_timestamp(value):
+    # value in the toISOString() shape, which sorts as a string.
+    if len(value) == 24 and value.endswith("Z"):
+        return value
+    dt = datetime.fromisoformat(value)
+    return iso_timestamp(dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc))
+
+def zero_counts(keys):
+    return dict.fromkeys(keys, 0)
+
+class Rollups:
+    """Per-book and per-workspace aggregates of one shard's rows.
+
+    Tasks are only tallied by (book, status, type, priority, due date)
+    while rows stream past, since the as-of time may only be known at the
+    end of the shard; the per-book and per-workspace counts and the due
+    buckets are folded from that tally when the rows are emitted.
+    """
+
+    def __init__(self, as_of=None):
+        self.as_of = as_of
+        self.latest = None
+        self.workspaces = {}
+        self.books = {}
+        self.tasks = {}
+        self.royalties = {}
+        self.handlers = {"workspaces": self.add_workspace, "books": self.add_book, "tasks": self.add_task,
+                         "royalties": self.add_royalty}
+
+    def touch(self, updated_at):
+        if updated_at:
+            updated_at = utc_timestamp(updated_at)
+            if self.latest is None or updated_at > self.latest:
+                self.latest = updated_at
+
+    def add_workspace(self, row):
+        self.workspaces[row[0]] = []
+        self.touch(row[8])
+
+    def add_book(self, row):
+        self.books[row[0]] = row[1]
+        books = self.workspaces.get(row[1])
+        if books is not None:
+            books.append(row[5])
+        self.touch(row[12])
+
+    def add_task(self, row):
+        # Due dates only matter for open tasks.
+        key = (row[1], row[5], row[6], row[7], None if row[5] == "DONE" else row[9] or "")
+        tasks = self.tasks
+        tasks[key] = tasks.get(key, 0) + 1
+        self.touch(row[11])
+
+    def add_royalty(self, row):
+        count, earnings = self.royalties.get(row[1], (0, 0.0))
+        self.royalties[row[1]] = (count + 1, earnings + (row[3] or 0.0))
+        self.touch(row[5])
+
+    def resolved_as_of(self):
+        return self.as_of or self.latest or EPOCH_TIMESTAMP
+
+    def due_bucket(self, bounds, due_date):
+        if due_date is None:
+            return None
+        if not due_date:
+            return "no_due_date"
+        return DUE_BUCKETS[bisect_right(bounds, utc_timestamp(due_date))]
+
+    def fold(self):
+        # {book or workspace id: stats} for every book and workspace seen.
+        def empty():
+            return {"total_tasks": 0, "tasks_by_status": zero_counts(TASK_STATUSES), "tasks_by_type": zero_counts(TASK_TYPES),
+                    "tasks_by_priority": zero_counts(PRIORITIES), "due_buckets": zero_counts((*DUE_BUCKETS, "no_due_date")),
+                    "royalty_count": 0, "royalty_earnings": 0.0}
+        books = {book_id: empty() for book_id in self.books}
+        workspaces = {ws_id: empty() for ws_id in self.workspaces}
+        # toISOString() timestamps sort as strings, so due dates are bucketed
+        # by bisecting against the bucket bounds in that shape.
+        start = datetime.fromisoformat(self.resolved_as_of())
+        bounds = [iso_timestamp(start + timedelta(days=days)) for days in DUE_BUCKET_DAYS]
+        buckets = {}
+        def targets(book_id):
+            ws = workspaces.get(self.books.get(book_id))
+            book = books.get(book_id)
+            return [stats for stats in (book, ws) if stats is not None]
+        for (book_id, status, kind, priority, due_date), n in self.tasks.items():
+            bucket = buckets.get(due_date)
+            if bucket is None and due_date is not None:
+                bucket = buckets[due_date] = self.due_bucket(bounds, due_date)
+            for stats in targets(book_id):
+                stats["total_tasks"] += n
+                for key, value in (("tasks_by_status", status), ("tasks_by_type", kind), ("tasks_by_priority", priority)):
+                    stats[key][value] = stats[key].get(value, 0) + n
+                if bucket is not None:
+                    stats["due_buckets"][bucket] += n
+        for book_id, (count, earnings) in self.royalties.items():
+            for stats in targets(book_id):
+                stats["royalty_count"] += count
+                stats["royalty_earnings"] += earnings
+        return books, workspaces
+
+    def rows(self):
+        books, workspaces = self.fold()
+        as_of = self.resolved_as_of()
+        for book_id, s in books.items():
+            yield "book_stats", (book_id, self.books[book_id], s["total_tasks"], s["tasks_by_status"], s["tasks_by_type"],
+                                 s["tasks_by_priority"], s["due_buckets"], s["royalty_count"], round(s["royalty_earnings"], 2), as_of)
+        for ws_id, s in workspaces.items():
+            by_status = zero_counts(BOOK_STATUSES)
+            for status in self.workspaces[ws_id]:
+                by_status[status] = by_status.get(status, 0) + 1
+            yield "workspace_stats", (ws_id, len(self.workspaces[ws_id]), by_status, s["total_tasks"], s["tasks_by_status"],
+                                      s["tasks_by_type"], s["tasks_by_priority"], s["due_buckets"], s["royalty_count"],
+                                      round(s["royalty_earnings"], 2), as_of)
+
+def rollup_rows(as_of, func, args, kwargs):
+    rollups = Rollups(as_of)
+    handlers = rollups.handlers
+    for table, row in func(*args, **kwargs):
+        handler = handlers.get(table)
+        if handler is not None:
+            handler(row)
+        yield table, row
+    yield from rollups.rows()
+
+def rollup_shards(shards, as_of=None):
+    # Wraps every shard so that it ends with the rollup rows of its books
+    # and workspaces.
+    for func, args, kwargs in shards:
+        yield rollup_rows, (as_of, func, args, kwargs), {}
+
+# Referentially closed subsets (--subset-workspace / --subset-book). Rows
+# are filtered in one pass with a set of kept ids per table, using the
+# foreign keys of the Prisma schema: a row is kept when it is a chosen root
+# or references (other than a user) a row reached from one, and every such
+# reference resolves to a kept row. A chosen book also pulls in its
+# workspace row, which is kept without being reached, so sibling books stay
+# out. Users come first in the stream but are only known to be
+# needed later, so the user rows and the kept rows are both spooled to
+# temporary files in stream order, and at the end the referenced users are
+# read back and emitted ahead of the kept rows. Only ids (of kept rows and
+# of referenced users) are held in memory.
+class Subset:
+    """Extracts the rows reachable from some workspace and book ids."""
+
+    def __init__(self, workspace_ids=(), book_ids=(), foreign_keys=None):
+        if foreign_keys is None:
+            foreign_keys = integrity_rules(parse_prisma_schema()[0])[0]
+        self.roots = {"workspaces": set(workspace_ids), "books": set(book_ids)}
+        self.kept = {table: set() for table in TABLES}
+        self.reached = {table: set() for table in TABLES}
+        self.counts = dict.fromkeys(TABLES, 0)
+        # Single-column references as (column index, referenced table),
+        # split into references to users and to everything else.
+        self.user_refs = {}
+        self.parent_refs = {}
+        for table, keys in foreign_keys.items():
+            refs = [(COLUMN_INDEXES[table][columns[0]], ref) for columns, ref, _ in keys if len(columns) == 1]
+            self.user_refs[table] = [i for i, ref in refs if ref == "users"]
+            self.parent_refs[table] = [(i, ref) for i, ref in refs if ref != "users"]
+
+    @staticmethod
+    def read_spool(f):
+        f.seek(0)
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+    def rows(self, rows):
+        kept, reached, roots, counts = self.kept, self.reached, self.roots, self.counts
+        needed = set()
+        pending = None
+        with tempfile.SpooledTemporaryFile(max_size=16 << 20) as spool, tempfile.SpooledTemporaryFile(max_size=16 << 20) as user_spool:
+            batch = []
+            user_batch = []
+            def keep(table, row):
+                kept[table].add(row[0])
+                counts[table] += 1
+                for i in self.user_refs[table]:
+                    if row[i] is not None:
+                        needed.add(row[i])
+                batch.append((table, row))
+                if len(batch) >= CHUNK_ROWS:
+                    pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+                    batch.clear()
+            for table, row in rows:
+                if table == "users":
+                    user_batch.append(row)
+                    if len(user_batch) >= CHUNK_ROWS:
+                        pickle.dump(user_batch, user_spool, pickle.HIGHEST_PROTOCOL)
+                        user_batch.clear()
+                    continue
+                parents = [(ref, row[i]) for i, ref in self.parent_refs[table] if row[i] is not None]
+                if row[0] in roots.get(table, ()):
+                    # A chosen book needs its workspace, which streamed past
+                    # just before its books.
+                    for ref, value in parents:
+                        if value not in kept[ref] and pending is not None and pending[0] == ref and pending[1][0] == value:
+                            keep(*pending)
+                    pending = None
+                elif not any(value in reached[ref] for ref, value in parents):
+                    if table == "workspaces":
+                        pending = (table, row)
+                    continue
+                if all(value in kept[ref] for ref, value in parents):
+                    reached[table].add(row[0])
+                    keep(table, row)
+            if batch:
+                pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+            if user_batch:
+                pickle.dump(user_batch, user_spool, pickle.HIGHEST_PROTOCOL)
+                user_batch.clear()
+            for row in self.read_spool(user_spool):
+                if row[0] in needed and row[0] not in kept["users"]:
+                    kept["users"].add(row[0])
+                    counts["users"] += 1
+                    yield "users", row
+            self.missing_users = needed - kept["users"]
+            yield from self.read_spool(spool)
+
+    def missing_roots(self):
+        return {table: sorted(ids - self.kept[table]) for table, ids in self.roots.items() if ids - self.kept[table]}
+
+def subset_rows(subset, shards):
+    return subset.rows(shard_rows(shards))
+
+# Clustered output (--cluster). Every table is emitted sorted by a
+# clustering key, so a COPY or INSERT into an empty table lays its heap out
+# in key order and "all tasks of a book" reads a few adjacent pages instead
+# of pages scattered over the table. The default keys follow the lookups of
+# the Express API (see --advise-indexes), with id breaking ties; other
+# tables keep stream order. Output goes table by table in TABLES order.
+CLUSTER_KEYS = {
+    "workspace_members": ("workspace_id", "id"),
+    "books": ("workspace_id", "id"),
+    "book_members": ("book_id", "id"),
+    "publishing_stages": ("author_book_id", "order", "id"),
+    "tasks": ("book_id", "id"),
+    "comments": ("task_id", "created_at", "id"),
+    "royalties": ("author_book_id", "id"),
+    "launch_plans": ("author_book_id", "id"),
+}
+SORT_BLOCK_ROWS = 4096
+
+def parse_cluster_key(value):
+    table, _, columns = value.partition("=")
+    columns = tuple(column.strip().strip('"') for column in columns.split(",") if column.strip())
+    if table not in TABLES or not columns:
+        raise argparse.ArgumentTypeError(f"expected TABLE=COLUMN[,COLUMN...] with TABLE one of {', '.join(TABLES)}")
+    unknown = [column for column in columns if column not in COLUMN_INDEXES[table]]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"{table} has no column {', '.join(unknown)}")
+    return table, columns
+
+def cluster_sort_key(indexes):
+    # NULLs sort last, as in an ascending PostgreSQL index.
+    def key(row):
+        return tuple([(row[i] is None, row[i]) for i in indexes])
+    return key
+
+def row_memory(row):
+    # Rough in-memory size of a row tuple, its values and its list slot.
+    return sys.getsizeof(row) + sum(map(sys.getsizeof, row)) + 8
+
+class ClusteredTables:
+    """External merge sort of a row stream into per-table key order.
+
+    Rows are buffered per table. Once all buffers together exceed
+    max_memory (estimated from the first row of each table), the largest
+    buffers are sorted and spilled to temporary files as runs of pickled
+    blocks. rows() then merges each table's runs and remaining buffer with
+    heapq.merge, reading one block per run at a time.
+    """
+
+    def __init__(self, keys, max_memory=256 << 20):
+        self.columns = keys
+        self.keys = {table: cluster_sort_key([COLUMN_INDEXES[table][c] for c in columns]) for table, columns in keys.items()}
+        self.max_memory = max_memory
+        self.buffers = {table: [] for table in TABLES}
+        self.row_sizes = {}
+        self.runs = {table: [] for table in TABLES}
+        self.memory = 0
+        self.spilled = 0
+
+    def add(self, table, row):
+        self.buffers[table].append(row)
+        size = self.row_sizes.get(table)
+        if size is None:
+            size = self.row_sizes[table] = row_memory(row)
+        self.memory += size
+        if self.memory > self.max_memory:
+            self.spill()
+
+    def spill(self):
+        # Spill down to half the budget so that runs stay large.
+        while self.memory > self.max_memory // 2:
+            table = max(self.buffers, key=lambda t: len(self.buffers[t]) * self.row_sizes.get(t, 0))
+            buffer = self.buffers[table]
+            if table in self.keys:
+                buffer.sort(key=self.keys[table])
+            f = tempfile.TemporaryFile()
+            for i in range(0, len(buffer), SORT_BLOCK_ROWS):
+                pickle.dump(buffer[i:i + SORT_BLOCK_ROWS], f, pickle.HIGHEST_PROTOCOL)
+            self.runs[table].append(f)
+            self.memory -= len(buffer) * self.row_sizes[table]
+            self.spilled += len(buffer)
+            self.buffers[table] = []
+
+    @staticmethod
+    def read_run(f):
+        f.seek(0)
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+    def rows(self):
+        try:
+            for table in TABLES:
+                buffer = self.buffers[table]
+                key = self.keys.get(table)
+                runs = [self.read_run(f) for f in self.runs[table]]
+                if key is None:
+                    merged = chain(*runs, buffer)
+                else:
+                    buffer.sort(key=key)
+                    merged = heapq.merge(*runs, buffer, key=key) if runs else buffer
+                for row in merged:
+                    yield table, row
+                self.memory -= len(buffer) * self.row_sizes.get(table, 0)
+                self.buffers[table] = []
+                for f in self.runs.pop(table):
+                    f.close()
+        finally:
+            for files in self.runs.values():
+                for f in files:
+                    f.close()
+
+def clustered_rows(clustered, shards):
+    add = clustered.add
+    for table, row in shard_rows(shards):
+        add(table, row)
+    return clustered.rows()
+
+# Workload traces (--trace). While the rows stream past, a fixed-size
+# uniform sample of the users, workspaces, books, stages and tasks is kept
+# per table (reservoir sampling, Li's algorithm L, so rows that are not
+# sampled cost a counter increment). The trace is then written as NDJSON,
+# one request per line: {"t", "route", "method", "path"[, "body"]}, with t
+# the offset in seconds of a Poisson arrival at the given rate. Each request
+# picks a read or write route by the write ratio and the route weights, and
+# its entity by a Zipf distribution over that table's sample. replay_trace.py
+# replays a trace against the Express server.
+TRACE_ROUTES = (
+    # (route, table, weight, write)
+    ("GET /api/workspaces/:id", "workspaces", 4, False),
+    ("GET /api/workspaces/:id/members", "workspaces", 6, False),
+    ("GET /api/books/:id", "books", 10, False),
+    ("GET /api/books/:bookId/members", "books", 6, False),
+    ("GET /api/books/:bookId/publishingStages", "books", 8, False),
+    ("GET /api/books/:bookId/tasks", "books", 12, False),
+    ("GET /api/books/:bookId/royalties", "books", 3, False),
+    ("GET /api/books/:bookId/launchPlans", "books", 3, False),
+    ("GET /api/tasks/:taskId", "tasks", 8, False),
+    ("GET /api/tasks/:taskId/comments", "tasks", 8, False),
+    ("GET /api/user-preferences/:userId", "users", 6, False),
+    ("PUT /api/user-preferences/:userId", "users", 3, True),
+    ("PUT /api/tasks/:taskId", "tasks", 6, True),
+    ("POST /api/tasks/:taskId/comments", "tasks", 4, True),
+    ("PUT /api/publishing-stages/:id", "publishing_stages", 1, True),
+)
+TRACE_TABLES = tuple(dict.fromkeys(table for _, table, _, _ in TRACE_ROUTES))
+THEMES = ("light", "dark")
+LANGUAGES = ("en", "en-ZA", "af", "zu")
+NOTIFICATION_TYPES = ("email", "push", "task_updates", "comments")
+
+class Reservoir:
+    """Uniform sample of up to size items of a stream (algorithm L)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.items = []
+        self.seen = 0
+        self.w = math.exp(math.log(rng.random()) / size)
+        self.next = size + self.skip()
+
+    def skip(self):
+        return int(math.log(self.rng.random()) / math.log(1 - self.w)) if self.w < 1 else 0
+
+    def add(self, item):
+        if self.seen < self.size:
+            self.items.append(item)
+        elif self.seen == self.next:
+            self.items[self.rng.randrange(self.size)] = item
+            self.w *= math.exp(math.log(self.rng.random()) / self.size)
+            self.next += self.skip() + 1
+        self.seen += 1
+
+class TraceSampler:
+    """Samples entities from a row stream and writes a request trace of them."""
+
+    def __init__(self, pool_size=100000, seed=0):
+        self.seed = seed
+        self.samples = {table: Reservoir(pool_size, random.Random(f"{seed}:trace:{table}")) for table in TRACE_TABLES}
+
+    def rows(self, rows):
+        samples = self.samples
+        for table, row in rows:
+            sample = samples.get(table)
+            if sample is not None:
+                sample.add(row)
+            yield table, row
+
+    def requests(self, count, write_ratio=0.1, zipf=1.1, rate=100.0):
+        rng = random.Random(f"{self.seed}:trace")
+        pools = {table: list(sample.items) for table, sample in self.samples.items() if sample.items}
+        # Popularity ranks follow a shuffled sample, not stream order.
+        for items in pools.values():
+            rng.shuffle(items)
+        cum_weights = {table: list(accumulate(1 / rank ** zipf for rank in range(1, len(items) + 1))) for table, items in pools.items()}
+        routes = {write: [(route, table, weight) for route, table, weight, is_write in TRACE_ROUTES if is_write == write and table in pools]
+                  for write in (False, True)}
+        if not routes[False] and not routes[True]:
+            return
+        preferences = set()
+        t = 0.0
+        for _ in range(count):
+            t += rng.expovariate(rate)
+            candidates = routes[rng.random() < write_ratio] or routes[False] or routes[True]
+            route, table, _ = rng.choices(candidates, weights=[weight for _, _, weight in candidates])[0]
+            row = rng.choices(pools[table], cum_weights=cum_weights[table])[0]
+            if table == "users" and row[0] not in preferences:
+                # The seed has no user_preferences rows, so the first request
+                # for a user's preferences, read or write, creates them;
+                # later GETs and PUTs then find the row instead of a 404.
+                preferences.add(row[0])
+                body = self.request_body("PUT /api/user-preferences/:userId", row, rng, t)
+                yield {"t": round(t, 6), "route": "POST /api/user-preferences", "method": "POST", "path": "/api/user-preferences",
+                       "body": {"user_id": row[0], **body}}
+                continue
+            method, path = route.split(" ", 1)
+            request = {"t": round(t, 6), "route": route, "method": method, "path": re.sub(r":\w+", quote(str(row[0]), safe=""), path)}
+            if method != "GET":
+                request["body"] = self.request_body(route, row, rng, t)
+            yield request
+
+    def request_body(self, route, row, rng, t):
+        now = iso_timestamp(TRACE_EPOCH + timedelta(seconds=t))
+        if route == "PUT /api/user-preferences/:userId":
+            return {"theme_preference": rng.choice(THEMES), "language_preference": rng.choice(LANGUAGES),
+                    "notifications": {kind: rng.random() < 0.5 for kind in NOTIFICATION_TYPES}}
+        if route == "PUT /api/tasks/:taskId":
+            task = dict(zip((name for name, _ in TABLES["tasks"]), row))
+            return {"title": task["title"], "description": task["description"], "status": rng.choice(TASK_STATUSES),
+                    "type": task["type"], "priority": task["priority"], "assignee_id": task["assignee_id"],
+                    "due_date": task["due_date"], "updatedAt": now, "publishing_stage_id": task["publishing_stage_id"]}
+        if route == "POST /api/tasks/:taskId/comments":
+            return {"userId": row[COLUMN_INDEXES["tasks"]["assignee_id"]], "content": rng.choice(COMMENT_TEXTS),
+                    "createdAt": now, "updatedAt": now}
+        if route == "PUT /api/publishing-stages/:id":
+            columns = COLUMN_INDEXES["publishing_stages"]
+            return {"name": row[columns["name"]], "description": row[columns["description"]], "order": row[columns["order"]]}
+        raise ValueError(f"no request body for {route}")
+
+    def write(self, path, count, write_ratio=0.1, zipf=1.1, rate=100.0):
+        written = 0
+        with OutputStream(path) as f:
+            for request in self.requests(count, write_ratio, zipf, rate):
+                f.write((json.dumps(request, separators=(",", ":")) + "\n").encode("utf-8"))
+                written += 1
+        return written
+
+TRACE_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def traced_rows(sampler, shards):
+    return sampler.rows(shard_rows(shards))
+
+def format_subset(subset):
+    lines = ["Subset: " + (", ".join(f"{count:,} {table}" for table, count in subset.counts.items() if count) or "no rows")]
+    for table, ids in subset.missing_roots().items():
+        lines.append(f"warning: no {table} with id {', '.join(ids)} in the input")
+    if subset.missing_users:
+        lines.append(f"warning: {len(subset.missing_users)} referenced users are not in the input: {', '.join(sorted(subset.missing_users)[:10])}")
+    return "\n".join(lines)
+
+CHUNK_ROWS = 10000
+
+def encode_chunk(fmt, rows, dialect="postgres", table_bytes=False):
+    # Encode rows into {table: (data, count, lengths)} of UTF-8/binary bytes.
+    # The insert format keeps nesting order in a single entry keyed by None;
+    # batched and binary output also record each row's byte length (as a
+    # packed "Q" array) so data can later be cut at row boundaries. The sqlite
+    # format carries lists of bind parameters instead of bytes. For --stats,
+    # table_bytes has the insert entry map each table to its share of the
+    # bytes in place of lengths; it costs a pass over the statements, so it
+    # is off otherwise.
+    if fmt == "insert":
+        prefixes = INSERT_PREFIXES
+        encoders = VALUE_ENCODERS[dialect]
+        statements = [f"{prefixes[table]}{encoders[table](row)};" for table, row in rows]
+        if not statements:
+            return {}
+        sizes = None
+        if table_bytes:
+            sizes = {}
+            for (table, _), statement in zip(rows, statements):
+                sizes[table] = sizes.get(table, 0) + (len(statement) if statement.isascii() else len(statement.encode("utf-8"))) + 1
+        return {None: (("\n".join(statements) + "\n").encode("utf-8"), len(statements), sizes)}
+    parts = {}
+    if fmt == "binary":
+        for table, row in rows:
+            parts.setdefault(table, []).append(PGCOPY_ROW_ENCODERS[table](row))
+        return {table: (b"".join(p), len(p), array("Q", map(len, p)).tobytes()) for table, p in parts.items()}
+    if fmt == "copy":
+        for table, row in rows:
+            parts.setdefault(table, []).append(COPY_ROW_ENCODERS[table](row))
+        return {table: (("\n".join(p) + "\n").encode("utf-8"), len(p), None) for table, p in parts.items()}
+    if fmt == "sqlite":
+        for table, row in rows:
+            parts.setdefault(table, []).append(sqlite_params(table, row))
+        return {table: (p, len(p), None) for table, p in parts.items()}
+    encoders = VALUE_ENCODERS[dialect]
+    for table, row in rows:
+        parts.setdefault(table, []).append(encoders[table](row).encode("utf-8"))
+    return {table: (b"".join(p), len(p), array("Q", map(len, p)).tobytes()) for table, p in parts.items()}
+
+# Fast-load envelope. The whole load runs in one transaction with
+# synchronous_commit off. Foreign keys, unique constraints and secondary
+# indexes on the seeded tables are read from the live catalog, dropped before
+# the data and recreated from their saved definitions afterwards, so they are
+# built once over the full data set instead of maintained row by row.
+# Primary keys stay in place, and so does anything an FK from an unseeded
+# table depends on. Finally every seeded table is analyzed.
+FAST_LOAD_PREAMBLE = f"""BEGIN;
+SET LOCAL synchronous_commit = off;
+SET LOCAL maintenance_work_mem = '512MB';
+CREATE TEMP TABLE seed_tables ON COMMIT DROP AS
+    SELECT to_regclass(name) AS rel FROM unnest(ARRAY[{", ".join(f"'{table}'" for table in TABLES)}]) AS name
+    WHERE to_regclass(name) IS NOT NULL;
+CREATE TEMP TABLE seed_deferred_ddl (pos serial, phase int, drop_sql text, create_sql text) ON COMMIT DROP;
+INSERT INTO seed_deferred_ddl (phase, drop_sql, create_sql)
+SELECT CASE c.contype WHEN 'f' THEN 1 ELSE 2 END,
+       format('ALTER TABLE %s DROP CONSTRAINT %I', c.conrelid::regclass, c.conname),
+       format('ALTER TABLE %s ADD CONSTRAINT %I %s', c.conrelid::regclass, c.conname, pg_get_constraintdef(c.oid))
+FROM pg_constraint c
+WHERE c.conrelid IN (SELECT rel FROM seed_tables) AND c.contype IN ('f', 'u')
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint f WHERE f.contype = 'f' AND c.contype = 'u' AND f.conindid = c.conindid
+                  AND f.conrelid NOT IN (SELECT rel FROM seed_tables))
+ORDER BY c.contype = 'u', c.conrelid, c.conname;
+INSERT INTO seed_deferred_ddl (phase, drop_sql, create_sql)
+SELECT 3, format('DROP INDEX %s', i.indexrelid::regclass), pg_get_indexdef(i.indexrelid)
+FROM pg_index i
+WHERE i.indrelid IN (SELECT rel FROM seed_tables) AND NOT i.indisprimary
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid AND c.contype <> 'f')
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint f WHERE f.contype = 'f' AND f.conindid = i.indexrelid
+                  AND f.conrelid NOT IN (SELECT rel FROM seed_tables))
+ORDER BY i.indrelid, i.indexrelid;
+DO $$
+DECLARE statement text;
+BEGIN
+    FOR statement IN SELECT drop_sql FROM seed_deferred_ddl ORDER BY phase, pos LOOP
+        EXECUTE statement;
+    END LOOP;
+END $$;
+"""
+
+# Only the seeded tables that exist are analyzed; the rollup tables, for one,
+# are absent unless --rollups created them.
+FAST_LOAD_POSTAMBLE = """DO $$
+DECLARE
+    statement text;
+    seed_table regclass;
+BEGIN
+    FOR statement IN SELECT create_sql FROM seed_deferred_ddl ORDER BY phase DESC, pos LOOP
+        EXECUTE statement;
+    END LOOP;
+    FOR seed_table IN SELECT rel FROM seed_tables LOOP
+        EXECUTE format('ANALYZE %s', seed_table);
+    END LOOP;
+END $$;
+COMMIT;
+"""
+
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") and "SC_IOV_MAX" in os.sysconf_names else 1024
+
+class OutputStream:
+    """Unbuffered-file writer that gathers bytes objects without copying them.
+
+    write() only appends a reference; once buffer_size bytes are pending they
+    go out in as few os.writev() calls as the kernel accepts, so encoded
+    chunks are never concatenated into an intermediate buffer. "-" writes to
+    stdout, and a named pipe works like any other path, which lets psql
+    consume the output while it is being generated. Only --format insert
+    streams that way: the batched and copy sinks and --diff regroup the rows,
+    so they write nothing until the input has been read to the end. Written
+    objects must not be mutated afterwards.
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        if path == "-":
+            sys.stdout.flush()
+            self.fd = sys.stdout.fileno()
+            self.owns_fd = False
+        else:
+            self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            self.owns_fd = True
+        self.buffer_size = buffer_size
+        self.pieces = []
+        self.pending = 0
+
+    def write(self, data):
+        if data:
+            self.pieces.append(data)
+            self.pending += len(data)
+            if self.pending >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        pieces = self.pieces
+        while pieces:
+            batch = pieces[:IOV_MAX]
+            if hasattr(os, "writev"):
+                written = os.writev(self.fd, batch)
+            else:
+                written = os.write(self.fd, batch[0])
+            # Drop what was written; a partially written piece (pipes accept
+            # short writes) continues as a memoryview slice.
+            done = 0
+            while done < len(batch) and written >= len(batch[done]):
+                written -= len(batch[done])
+                done += 1
+            del pieces[:done]
+            if written:
+                pieces[0] = memoryview(pieces[0])[written:]
+        self.pending = 0
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.owns_fd:
+                os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class InsertSink:
+    """Writes per-row INSERT statements in the order they were produced."""
+
+    def __init__(self, output_file_name, buffer_size=1 << 20, fast_load=False, ddl="", **_):
+        self.file = OutputStream(output_file_name, buffer_size)
+        self.fast_load = fast_load
+        self.file.write(ddl.encode("utf-8"))
+        if fast_load:
+            self.file.write(FAST_LOAD_PREAMBLE.encode("utf-8"))
+        self.count = 0
+
+    def add(self, chunk):
+        for data, count, _ in chunk.values():
+            self.file.write(data)
+            self.count += count
+
+    def close(self):
+        if self.fast_load:
+            self.file.write(FAST_LOAD_POSTAMBLE.encode("utf-8"))
+        self.file.close()
+        return self.count
+
+class TableSpool:
+    """Regroups encoded chunks by table without holding them in memory.
+
+    Each table's bytes (and row lengths, when present) go to a spooled
+    temporary file that stays in memory up to ``max_memory`` bytes and rolls
+    over to disk after that.
+    """
+
+    def __init__(self, max_memory=4 << 20):
+        self.max_memory = max_memory
+        self.data = {}
+        self.lengths = {}
+        self.counts = dict.fromkeys(TABLES, 0)
+
+    def _spool(self, files, table):
+        f = files.get(table)
+        if f is None:
+            f = files[table] = tempfile.SpooledTemporaryFile(max_size=self.max_memory)
+        return f
+
+    def add(self, chunk):
+        for table, (data, count, lengths) in chunk.items():
+            self._spool(self.data, table).write(data)
+            if lengths is not None:
+                self._spool(self.lengths, table).write(lengths)
+            self.counts[table] += count
+
+    def copy_table(self, table, write, block_size=1 << 20):
+        f = self.data.get(table)
+        if f is None:
+            return
+        f.seek(0)
+        while block := f.read(block_size):
+            write(block)
+
+    def iter_batches(self, table, batch_size):
+        # Yields lists of encoded rows, batch_size rows at a time.
+        f = self.data.get(table)
+        if f is None:
+            return
+        f.seek(0)
+        lengths_file = self.lengths[table]
+        lengths_file.seek(0)
+        item_size = array("Q").itemsize
+        while block := lengths_file.read(batch_size * item_size):
+            lengths = array("Q", block)
+            data = f.read(sum(lengths))
+            rows = []
+            offset = 0
+            for length in lengths:
+                rows.append(data[offset:offset + length])
+                offset += length
+            yield rows
+
+    def close(self):
+        for f in (*self.data.values(), *self.lengths.values()):
+            f.close()
+        self.data.clear()
+        self.lengths.clear()
+
+class BatchedSink(TableSpool):
+    """Groups rows per table into multi-row INSERTs of at most batch_size rows.
+
+    With transaction_every set, every that many statements are wrapped in
+    BEGIN/COMMIT.
+    """
+
+    def __init__(self, output_file_name, batch_size=1000, transaction_every=0, buffer_size=1 << 20, fast_load=False, ddl="", **_):
+        super().__init__()
+        self.output_file_name = output_file_name
+        self.batch_size = batch_size
+        self.transaction_every = transaction_every
+        self.buffer_size = buffer_size
+        self.fast_load = fast_load
+        self.ddl = ddl
+
+    def close(self):
+        statements = 0
+        try:
+            with OutputStream(self.output_file_name, self.buffer_size) as f:
+                write = f.write
+                write(self.ddl.encode("utf-8"))
+                if self.fast_load:
+                    write(FAST_LOAD_PREAMBLE.encode("utf-8"))
+                for table in TABLES:
+                    prefix = INSERT_PREFIXES[table].rstrip().encode("utf-8") + b"\n"
+                    for rows in self.iter_batches(table, self.batch_size):
+                        if self.transaction_every and statements % self.transaction_every == 0:
+                            write(b"BEGIN;\n" if statements == 0 else b"COMMIT;\nBEGIN;\n")
+                        write(prefix)
+                        write(b",\n".join(rows))
+                        write(b";\n")
+                        statements += 1
+                if self.transaction_every and statements:
+                    write(b"COMMIT;\n")
+                if self.fast_load:
+                    write(FAST_LOAD_POSTAMBLE.encode("utf-8"))
+        finally:
+            super().close()
+        return sum(self.counts.values())
+
+class CopySink(TableSpool):
+    """Writes one COPY ... FROM STDIN block per table, loadable with psql -f."""
+
+    def __init__(self, output_file_name, buffer_size=1 << 20, fast_load=False, ddl="", **_):
+        super().__init__()
+        self.output_file_name = output_file_name
+        self.buffer_size = buffer_size
+        self.fast_load = fast_load
+        self.ddl = ddl
+
+    def close(self):
+        try:
+            with OutputStream(self.output_file_name, self.buffer_size) as f:
+                f.write(self.ddl.encode("utf-8"))
+                if self.fast_load:
+                    f.write(FAST_LOAD_PREAMBLE.encode("utf-8"))
+                for table in TABLES:
+                    if not self.counts[table]:
+                        continue
+                    f.write(COPY_HEADERS[table].encode("utf-8"))
+                    self.copy_table(table, f.write)
+                    f.write(b"\\.\n")
+                if self.fast_load:
+                    f.write(FAST_LOAD_POSTAMBLE.encode("utf-8"))
+        finally:
+            super().close()
+        return sum(self.counts.values())
+
+class BinarySink:
+    """Writes one <table>.pgcopy file per table plus a load.sql that \\copy's
+    them in foreign-key order. Run psql -f load.sql from inside output_dir.
+    """
+
+    def __init__(self, output_dir, buffer_size=1 << 20, fast_load=False, ddl="", **_):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.buffer_size = buffer_size
+        self.fast_load = fast_load
+        self.ddl = ddl
+        self.files = {}
+        self.count = 0
+
+    def add(self, chunk):
+        for table, (data, count, _) in chunk.items():
+            f = self.files.get(table)
+            if f is None:
+                f = self.files[table] = open(os.path.join(self.output_dir, f"{table}.pgcopy"), "wb", buffering=self.buffer_size)
+                f.write(PGCOPY_HEADER)
+            f.write(data)
+            self.count += count
+
+    def close(self):
+        for f in self.files.values():
+            f.write(PGCOPY_TRAILER)
+            f.close()
+        with open(os.path.join(self.output_dir, "load.sql"), "w", encoding="utf-8") as f:
+            f.write(self.ddl)
+            if self.fast_load:
+                f.write(FAST_LOAD_PREAMBLE)
+            for table, columns in TABLES.items():
+                if table in self.files:
+                    column_list = ", ".join(quote_column(name) for name, _ in columns)
+                    f.write(f"\\copy {table} ({column_list}) FROM '{table}.pgcopy' WITH (FORMAT binary)\n")
+            if self.fast_load:
+                f.write(FAST_LOAD_POSTAMBLE)
+        return self.count
+
+class SqliteSink:
+    """Loads rows straight into a SQLite database file.
+
+    Any existing file is replaced. Tables are created from TABLES and each
+    chunk is bound with executemany inside a single transaction. Journaling
+    and fsyncs are off: an interrupted load is simply regenerated.
+    """
+
+    def __init__(self, output_file_name, **_):
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(output_file_name + suffix):
+                os.remove(output_file_name + suffix)
+        self.db = sqlite3.connect(output_file_name, isolation_level=None)
+        self.db.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            PRAGMA locking_mode = EXCLUSIVE;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA cache_size = -65536;
+        """)
+        for statement in sqlite_ddl():
+            self.db.execute(statement)
+        self.db.execute("BEGIN")
+        self.count = 0
+
+    def add(self, chunk):
+        for table, (params, count, _) in chunk.items():
+            self.db.executemany(SQLITE_INSERTS[table], params)
+            self.count += count
+
+    def close(self):
+        self.db.execute("COMMIT")
+        self.db.close()
+        return self.count
+
+# Shard compression: a streaming compressor factory per codec, taking a level.
+# gzip output is a plain .gz member (wbits=31); zstd needs the optional
+# zstandard package.
+COMPRESSORS = {
+    "gzip": lambda level: zlib.compressobj(level, zlib.DEFLATED, 31),
+    "zstd": lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+}
+COMPRESSION_LEVELS = {"gzip": 6, "zstd": 3}
+COMPRESSED_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+DECOMPRESS_COMMANDS = {None: "cat", "gzip": "gzip -dc", "zstd": "zstd -dc"}
+
+class ShardFile:
+    """One output shard. With a compressor, writes are handed to a background
+    thread through a bounded queue so compression overlaps encoding; zlib and
+    zstandard release the GIL while compressing.
+    """
+
+    def __init__(self, path, compressor=None, buffer_size=1 << 20):
+        self.file = open(path, "wb", buffering=buffer_size)
+        self.name = os.path.basename(path)
+        self.size = 0
+        self.rows = 0
+        self.statements = 0
+        self.compressor = compressor
+        self.error = None
+        if compressor is not None:
+            self.queue = queue.Queue(maxsize=16)
+            self.thread = threading.Thread(target=self._compress, daemon=True)
+            self.thread.start()
+
+    def _compress(self):
+        while (data := self.queue.get()) is not None:
+            if self.error is None:
+                try:
+                    self.file.write(self.compressor.compress(data))
+                except BaseException as e:
+                    self.error = e
+        if self.error is None:
+            self.file.write(self.compressor.flush())
+
+    def write(self, data):
+        self.size += len(data)
+        if self.compressor is None:
+            self.file.write(data)
+        else:
+            self.queue.put(data)
+
+    def close(self):
+        if self.compressor is not None:
+            self.queue.put(None)
+            self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+class ShardedSink:
+    """Writes each table to its own set of shard files of at most shard_size
+    uncompressed bytes, optionally gzip or zstd compressed.
+
+    Every shard is self-contained (a COPY block, whole INSERT statements or a
+    complete PGCOPY file), so the shards of one table can be loaded by
+    concurrent sessions once the tables it references are in. A
+    manifest.json lists the shards in foreign-key order, and load.sh replays
+    them that way with up to $JOBS psql sessions per table, after running
+    the 00_schema.sql DDL file when there is one.
+    """
+
+    SCHEMA_FILE = "00_schema.sql"
+
+    def __init__(self, fmt, output_dir, shard_size=None, compress=None, compress_level=None,
+                 batch_size=1000, transaction_every=0, buffer_size=1 << 20, ddl=""):
+        os.makedirs(output_dir, exist_ok=True)
+        self.fmt = fmt
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.compress = compress
+        self.compress_level = COMPRESSION_LEVELS.get(compress) if compress_level is None else compress_level
+        self.batch_size = batch_size
+        self.transaction_every = transaction_every
+        self.buffer_size = buffer_size
+        self.ddl = ddl
+        self.open_shards = {}
+        self.shards = {table: [] for table in TABLES}
+        self.pending = {table: [] for table in TABLES}
+        self.count = 0
+
+    def _header(self, table):
+        if self.fmt == "copy":
+            return COPY_HEADERS[table].encode("utf-8")
+        if self.fmt == "binary":
+            return PGCOPY_HEADER
+        return b"BEGIN;\n" if self.transaction_every else b""
+
+    def _trailer(self):
+        if self.fmt == "copy":
+            return b"\\.\n"
+        if self.fmt == "binary":
+            return PGCOPY_TRAILER
+        return b"COMMIT;\n" if self.transaction_every else b""
+
+    def _room(self, f):
+        if self.shard_size is None:
+            return float("inf")
+        return self.shard_size - f.size - len(self._trailer())
+
+    def _shard(self, table):
+        f = self.open_shards.get(table)
+        if f is None:
+            part = len(self.shards[table]) + 1
+            extension = "pgcopy" if self.fmt == "binary" else "sql"
+            name = f"{list(TABLES).index(table) + 1:02d}_{table}.{part:04d}.{extension}{COMPRESSED_SUFFIXES[self.compress]}"
+            compressor = COMPRESSORS[self.compress](self.compress_level) if self.compress else None
+            f = self.open_shards[table] = ShardFile(os.path.join(self.output_dir, name), compressor, self.buffer_size)
+            f.write(self._header(table))
+        return f
+
+    def _finish(self, table):
+        f = self.open_shards.pop(table)
+        f.write(self._trailer())
+        f.close()
+        self.shards[table].append({"file": f.name, "rows": f.rows, "bytes": f.size})
+
+    def _add_rows(self, table, data, ends):
+        # ends holds the cumulative end offset of every row in data. Cuts
+        # fall on row boundaries; a single row larger than a shard gets a
+        # shard of its own.
+        start = i = 0
+        while i < len(ends):
+            f = self._shard(table)
+            j = bisect_right(ends, start + self._room(f), i)
+            if j == i:
+                if f.rows:
+                    self._finish(table)
+                    continue
+                j = i + 1
+            f.write(data[start:ends[j - 1]])
+            f.rows += j - i
+            start, i = ends[j - 1], j
+            if i < len(ends):
+                self._finish(table)
+
+    def _add_statement(self, table, rows):
+        statement = b"".join((INSERT_PREFIXES[table].rstrip().encode("utf-8"), b"\n", b",\n".join(rows), b";\n"))
+        f = self._shard(table)
+        if f.rows and len(statement) > self._room(f):
+            self._finish(table)
+            f = self._shard(table)
+        if self.transaction_every and f.statements and f.statements % self.transaction_every == 0:
+            f.write(b"COMMIT;\nBEGIN;\n")
+        f.write(statement)
+        f.rows += len(rows)
+        f.statements += 1
+
+    def add(self, chunk):
+        for table, (data, count, lengths) in chunk.items():
+            self.count += count
+            if self.fmt == "batched":
+                pending = self.pending[table]
+                offset = 0
+                for length in array("Q", lengths):
+                    pending.append(data[offset:offset + length])
+                    offset += length
+                    if len(pending) >= self.batch_size:
+                        self._add_statement(table, pending)
+                        pending.clear()
+            elif self.shard_size is None:
+                f = self._shard(table)
+                f.write(data)
+                f.rows += count
+            elif lengths is not None:
+                self._add_rows(table, data, list(accumulate(array("Q", lengths))))
+            else:
+                self._add_rows(table, data, [m.end() for m in re.finditer(b"\n", data)])
+
+    def close(self):
+        for table, pending in self.pending.items():
+            if pending:
+                self._add_statement(table, pending)
+                pending.clear()
+        for table in list(self.open_shards):
+            self._finish(table)
+        if self.ddl:
+            with open(os.path.join(self.output_dir, self.SCHEMA_FILE), "w", encoding="utf-8") as f:
+                f.write(self.ddl)
+        manifest = {
+            "format": self.fmt,
+            "compression": self.compress,
+            "shard_size": self.shard_size,
+            "schema": self.SCHEMA_FILE if self.ddl else None,
+            "tables": [{"table": table, "shards": shards} for table, shards in self.shards.items() if shards],
+        }
+        with open(os.path.join(self.output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        path = os.path.join(self.output_dir, "load.sh")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.load_script())
+        os.chmod(path, 0o755)
+        return self.count
+
+    def load_script(self):
+        lines = [
+            "#!/bin/sh",
+            "# Loads the shards in foreign-key order, table by table, with up to $JOBS",
+            "# concurrent psql sessions per table. Connection settings come from the",
+            "# usual PG* environment variables.",
+            "set -e",
+            'cd "$(dirname "$0")"',
+            'JOBS="${JOBS:-4}"',
+        ]
+        psql = "psql -X -q -v ON_ERROR_STOP=1"
+        if self.ddl:
+            lines.append(f"{psql} -f {self.SCHEMA_FILE}")
+        for table, shards in self.shards.items():
+            if not shards:
+                continue
+            if self.fmt == "binary":
+                column_list = ", ".join(quote_column(name) for name, _ in TABLES[table]).replace('"', '\\"')
+                load = f'{psql} -c "\\copy {table} ({column_list}) FROM pstdin WITH (FORMAT binary)"'
+            else:
+                load = psql
+            files = " ".join(shard["file"] for shard in shards)
+            lines.append(f"printf '%s\\n' {files} | xargs -P \"$JOBS\" -n 1 sh -c '{DECOMPRESS_COMMANDS[self.compress]} \"$1\" | {load}' sh")
+        return "\n".join(lines) + "\n"
+
+SINKS = {
+    "insert": InsertSink,
+    "batched": BatchedSink,
+    "copy": CopySink,
+    "binary": BinarySink,
+    "sqlite": SqliteSink,
+}
+
+def load_dependencies(schema_path=SCHEMA_PATH):
+    # {table: set of tables it references}, from the foreign keys in the
+    # Prisma schema. Self-references do not order anything.
+    foreign_keys = integrity_rules(parse_prisma_schema(schema_path)[0])[0]
+    return {table: {ref for _, ref, _ in fks if ref != table} for table, fks in foreign_keys.items()}
+
+class PostgresLoader(TableSpool):
+    """Sink that COPYs the data straight into PostgreSQL over a pool of
+    connections, instead of writing a file.
+
+    Rows arrive as PGCOPY binary chunks and are spooled per table while the
+    data is generated. close() then walks the foreign-key DAG: a table starts
+    loading once every table it references has been fully loaded, and each
+    table is cut into shards of shard_rows rows that are COPYed concurrently,
+    one transaction per shard. At most two shards per connection are read
+    from the spool ahead of time. ddl, if given, is run before anything is
+    loaded. Needs the psycopg (3) package.
+    """
+
+    def __init__(self, dsn, connections=4, shard_rows=100000, truncate=False, dependencies=None, ddl="", **_):
+        super().__init__()
+        self.dsn = dsn
+        self.connections = connections
+        self.shard_rows = shard_rows
+        self.truncate = truncate
+        self.ddl = ddl
+        self.dependencies = load_dependencies() if dependencies is None else dependencies
+        self.report = {}
+
+    def _copy(self, pool, table, data, rows):
+        conn = pool.get()
+        try:
+            started = time.perf_counter()
+            with conn.cursor() as cur:
+                with cur.copy(PGCOPY_STATEMENTS[table]) as copy:
+                    copy.write(PGCOPY_HEADER)
+                    copy.write(data)
+                    copy.write(PGCOPY_TRAILER)
+            conn.commit()
+            return table, rows, len(data), started, time.perf_counter()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            pool.put(conn)
+
+    def load(self):
+        tables = [table for table in TABLES if self.counts[table]]
+        waiting = {table: self.dependencies.get(table, set()) & set(tables) for table in tables}
+        pool = queue.Queue()
+        connections = [psycopg.connect(self.dsn) for _ in range(self.connections)]
+        try:
+            if self.ddl:
+                connections[0].execute(self.ddl)
+                connections[0].commit()
+            if self.truncate:
+                # The tables being loaded that exist (the rollup tables are
+                # optional), plus the seed tables referencing them, in one
+                # statement that satisfies the foreign keys between them.
+                # There is no CASCADE: a table outside the seed that
+                # references them (such as user_preferences) is never
+                # emptied behind the user's back.
+                targets = [name for name, in connections[0].execute(
+                    "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL", (tables,))]
+                while targets:
+                    referencing = connections[0].execute(
+                        "SELECT DISTINCT conrelid::regclass::text, confrelid::regclass::text FROM pg_constraint "
+                        "WHERE contype = 'f' AND confrelid = ANY(%s::regclass[]) AND NOT conrelid = ANY(%s::regclass[]) "
+                        "ORDER BY 1, 2", (targets, targets)).fetchall()
+                    outside = [(table, ref) for table, ref in referencing if table not in TABLES]
+                    if outside:
+                        raise RuntimeError("--truncate would have to cascade into tables outside the seed: "
+                                           + ", ".join(f"{table} references {ref}" for table, ref in outside)
+                                           + "; empty or drop them first")
+                    if not referencing:
+                        connections[0].execute(f"TRUNCATE {', '.join(targets)}")
+                        break
+                    targets.extend(dict.fromkeys(table for table, _ in referencing))
+                connections[0].commit()
+            for conn in connections:
+                pool.put(conn)
+            report = {}
+            ready = deque()
+            batches = {}
+            in_flight = dict.fromkeys(tables, 0)
+            active = set()
+            def release():
+                for table in [t for t, deps in waiting.items() if not deps]:
+                    del waiting[table]
+                    ready.append(table)
+                    batches[table] = self.iter_batches(table, self.shard_rows)
+            def finished(table):
+                for deps in waiting.values():
+                    deps.discard(table)
+                release()
+            release()
+            with ThreadPoolExecutor(self.connections) as executor:
+                while ready or active:
+                    while ready and len(active) < 2 * self.connections:
+                        table = ready[0]
+                        rows = next(batches[table], None)
+                        if rows is None:
+                            ready.popleft()
+                            del batches[table]
+                            if not in_flight[table]:
+                                finished(table)
+                            continue
+                        in_flight[table] += 1
+                        active.add(executor.submit(self._copy, pool, table, b"".join(rows), len(rows)))
+                    if not active:
+                        continue
+                    done, active = wait(active, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        table, rows, size, started, ended = future.result()
+                        stats = report.setdefault(table, {"rows": 0, "bytes": 0, "shards": 0, "started": started, "ended": ended})
+                        stats["rows"] += rows
+                        stats["bytes"] += size
+                        stats["shards"] += 1
+                        stats["started"] = min(stats["started"], started)
+                        stats["ended"] = max(stats["ended"], ended)
+                        in_flight[table] -= 1
+                        if not in_flight[table] and table not in batches:
+                            finished(table)
+        finally:
+            for conn in connections:
+                conn.close()
+        if waiting:
+            raise RuntimeError(f"foreign-key cycle between {', '.join(waiting)}")
+        for stats in report.values():
+            seconds = max(stats.pop("ended") - stats.pop("started"), 1e-9)
+            stats["seconds"] = seconds
+            stats["rows_per_s"] = stats["rows"] / seconds
+            stats["mb_per_s"] = stats["bytes"] / seconds / 1e6
+        return report
+
+    def close(self):
+        try:
+            self.report = self.load()
+        finally:
+            super().close()
+        return sum(self.counts.values())
+
+PGCOPY_STATEMENTS = {
+    table: f"COPY {table} ({', '.join(quote_column(name) for name, _ in columns)}) FROM STDIN WITH (FORMAT binary)"
+    for table, columns in TABLES.items()
+}
+
+def iter_chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+def write_rows(fmt, rows, sink, dialect="postgres", stats=None):
+    if stats is not None:
+        with stats.instrument_encoders():
+            return stats.write_rows(fmt, rows, sink, dialect)
+    for chunk in iter_chunks(rows):
+        sink.add(encode_chunk(fmt, chunk, dialect))
+    return sink.close()
+
+def write_shards(fmt, shards, sink, jobs=1, dialect="postgres", stats=None):
+    # With jobs > 1 the rows are generated here and cut into chunks of at
+    # most CHUNK_ROWS rows, which worker processes encode; a shard is never
+    # sent whole, so one huge workspace cannot pin a worker or sit in memory
+    # as a single result. Results are consumed strictly in submission order,
+    # with at most two chunks per worker in flight, so the output is
+    # byte-identical to a serial run and memory stays bounded.
+    if jobs <= 1:
+        return write_rows(fmt, shard_rows(shards), sink, dialect, stats)
+    rows = shard_rows(shards)
+    add, result, close = sink.add, Future.result, sink.close
+    if stats is not None:
+        rows = stats.timed("rows", stats.count_rows(rows))
+        add, result, close = stats.chunk_writer(sink), stats.timed_call("wait", result), stats.timed_call("write", close)
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for chunk in iter_chunks(rows):
+            pending.append(pool.submit(encode_chunk, fmt, chunk, dialect, stats is not None))
+            if len(pending) >= 2 * jobs:
+                add(result(pending.popleft()))
+        while pending:
+            add(result(pending.popleft()))
+    return close()
+
+class RunStats:
+    """Timers and counters for one generation run, behind --stats.
+
+    Nothing is instrumented unless a RunStats is passed to write_shards, so a
+    normal run pays nothing. Iterators and calls are timed with
+    time.perf_counter into named timers. In a serial run the compiled
+    per-table encoders are also swapped for timed wrappers for the duration
+    of the run; with --jobs the encoding happens in workers, so there is no
+    per-table encode time, only the time spent waiting for the workers.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.timers = {}
+        self.tables = {table: {"rows": 0, "bytes": 0, "encode_s": 0.0} for table in TABLES}
+        self.chunks = 0
+        self.bytes = 0
+        self.trace_memory = trace_memory
+        self.memory_peak = None
+        self.started = self.finished = None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+        if self.trace_memory:
+            self.memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def timed(self, name, iterable):
+        # Yields from iterable, charging only the time spent producing items.
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        while True:
+            started = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, clock() - started)
+                return
+            self.add_time(name, clock() - started)
+            yield item
+
+    def timed_call(self, name, func):
+        clock = time.perf_counter
+        def call(*args):
+            started = clock()
+            try:
+                return func(*args)
+            finally:
+                self.add_time(name, clock() - started)
+        return call
+
+    def count_rows(self, rows):
+        tables = self.tables
+        for item in rows:
+            tables[item[0]]["rows"] += 1
+            yield item
+
+    def chunk_writer(self, sink):
+        # sink.add timed as "write", counting encoded bytes per table. Insert
+        # chunks mix tables under the key None and carry the per-table split
+        # (see encode_chunk's table_bytes); sqlite chunks hold bind
+        # parameters and have no encoded bytes.
+        add = self.timed_call("write", sink.add)
+        tables = self.tables
+        def write(chunk):
+            self.chunks += 1
+            for table, (data, _, lengths) in chunk.items():
+                size = len(data) if isinstance(data, bytes) else 0
+                self.bytes += size
+                if table is not None:
+                    tables[table]["bytes"] += size
+                elif lengths is not None:
+                    for name, table_size in lengths.items():
+                        tables[name]["bytes"] += table_size
+            add(chunk)
+        return write
+
+    @contextmanager
+    def instrument_encoders(self):
+        clock = time.perf_counter
+        def timed_encoder(encoder, stats):
+            def encode(row):
+                started = clock()
+                result = encoder(row)
+                stats["encode_s"] += clock() - started
+                return result
+            return encode
+        registries = (*VALUE_ENCODERS.values(), COPY_ROW_ENCODERS, PGCOPY_ROW_ENCODERS)
+        originals = [dict(registry) for registry in registries]
+        for registry in registries:
+            for table, encoder in registry.items():
+                registry[table] = timed_encoder(encoder, self.tables[table])
+        try:
+            yield
+        finally:
+            for registry, original in zip(registries, originals):
+                registry.update(original)
+
+    def write_rows(self, fmt, rows, sink, dialect):
+        # The "rows" timer covers row generation including any lazy input
+        # parsing underneath it; report() subtracts the "parse" timer.
+        encode = self.timed_call("encode", encode_chunk)
+        add = self.chunk_writer(sink)
+        for chunk in iter_chunks(self.timed("rows", self.count_rows(rows))):
+            add(encode(fmt, chunk, dialect, True))
+        return self.timed_call("write", sink.close)()
+
+    def report(self, **extra):
+        timers = dict(self.timers)
+        if "rows" in timers:
+            timers["generate"] = timers.pop("rows") - timers.get("parse", 0.0)
+        report = {
+            **extra,
+            "wall_s": self.finished - self.started,
+            "timers_s": timers,
+            "chunks": self.chunks,
+            "encoded_bytes": self.bytes,
+            "tables": self.tables,
+            "literal_caches": literal_cache_stats(),
+        }
+        if self.memory_peak is not None:
+            report["tracemalloc_peak_bytes"] = self.memory_peak
+        return report
+
+def format_stats(report):
+    lines = [f"wall {report['wall_s']:.3f}s, {report['chunks']} chunks, {report['encoded_bytes']:,} encoded bytes"]
+    lines += [f"  {name:<10} {seconds:9.3f}s" for name, seconds in report["timers_s"].items()]
+    lines.append(f"  {'table':<20} {'rows':>10} {'bytes':>14} {'encode_s':>10}")
+    for table, stats in report["tables"].items():
+        lines.append(f"  {table:<20} {stats['rows']:>10,} {stats['bytes']:>14,} {stats['encode_s']:>10.3f}")
+    for name, info in report["literal_caches"].items():
+        lookups = info["hits"] + info["misses"]
+        if lookups:
+            lines.append(f"literal cache {name}: {info['hits']:,} hits, {info['misses']:,} misses "
+                         f"({info['hits'] / lookups:.0%}), {info['currsize']:,}/{info['maxsize']:,} entries")
+    if "tracemalloc_peak_bytes" in report:
+        lines.append(f"tracemalloc peak {report['tracemalloc_peak_bytes'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
+
+UPSERT_SUFFIXES = {
+    table: " ON CONFLICT (id) DO UPDATE SET " + ", ".join(f"{quote_column(name)} = EXCLUDED.{quote_column(name)}" for name, _ in columns if name != "id")
+    for table, columns in TABLES.items()
+}
+
+def format_upsert(table, row, dialect="postgres"):
+    return f"{INSERT_PREFIXES[table]}{format_values(table, row, dialect)}{UPSERT_SUFFIXES[table]};"
+
+def row_hash(row):
+    # repr() of the raw values is stable across runs and Python versions for
+    # the str/int/float/None/dict/list values rows are made of.
+    return hashlib.blake2b(repr(row).encode("utf-8"), digest_size=16).digest()
+
+class EntityHashCache:
+    """Persistent content hashes of every emitted row, keyed by (table, id).
+
+    Backed by SQLite so that lookups stay on disk instead of in a dict that
+    grows with the dataset. Hashes seen during the current run are collected
+    in a temporary table, and stage() saves them as pending along with the
+    name of the diff they belong to. Only commit(), run once that diff has
+    been applied, makes them the baseline, so a diff that was never applied
+    (or failed) is simply produced again by the next run.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS entity_hashes (tbl TEXT NOT NULL, id TEXT NOT NULL, hash BLOB NOT NULL, PRIMARY KEY (tbl, id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS pending_hashes (tbl TEXT NOT NULL, id TEXT NOT NULL, hash BLOB NOT NULL, PRIMARY KEY (tbl, id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS pending_diff (one INTEGER PRIMARY KEY CHECK (one = 1), output TEXT NOT NULL);
+            CREATE TEMP TABLE seen (tbl TEXT NOT NULL, id TEXT NOT NULL, hash BLOB NOT NULL, PRIMARY KEY (tbl, id)) WITHOUT ROWID;
+            CREATE TEMP TABLE batch (pos INTEGER PRIMARY KEY, tbl TEXT NOT NULL, id TEXT NOT NULL, hash BLOB NOT NULL);
+        """)
+
+    def changed(self, chunk):
+        # Returns the (table, row) pairs of chunk that are new or whose content
+        # differs from the previous run, preserving their order.
+        db = self.db
+        db.execute("DELETE FROM temp.batch")
+        db.executemany("INSERT INTO temp.batch VALUES (?, ?, ?, ?)",
+                       ((pos, table, row[0], row_hash(row)) for pos, (table, row) in enumerate(chunk)))
+        positions = db.execute("""
+            SELECT b.pos FROM temp.batch b
+            LEFT JOIN entity_hashes e ON e.tbl = b.tbl AND e.id = b.id
+            WHERE e.hash IS NULL OR e.hash != b.hash
+            ORDER BY b.pos
+        """).fetchall()
+        db.execute("INSERT OR REPLACE INTO temp.seen SELECT tbl, id, hash FROM temp.batch")
+        return [chunk[pos] for pos, in positions]
+
+    def deleted(self, table):
+        return (id for id, in self.db.execute("""
+            SELECT id FROM entity_hashes e
+            WHERE e.tbl = ? AND NOT EXISTS (SELECT 1 FROM temp.seen s WHERE s.tbl = e.tbl AND s.id = e.id)
+            ORDER BY id
+        """, (table,)))
+
+    def stage(self, output_file_name):
+        with self.db:
+            self.db.execute("DELETE FROM pending_hashes")
+            self.db.execute("INSERT INTO pending_hashes SELECT tbl, id, hash FROM temp.seen")
+            self.db.execute("INSERT OR REPLACE INTO pending_diff VALUES (1, ?)", (output_file_name,))
+
+    def commit(self):
+        # Promotes the pending hashes; returns the name of the diff they came
+        # with, or None when there is nothing pending.
+        with self.db:
+            pending = self.db.execute("SELECT output FROM pending_diff").fetchone()
+            if pending is None:
+                return None
+            self.db.execute("DELETE FROM entity_hashes")
+            self.db.execute("INSERT INTO entity_hashes SELECT tbl, id, hash FROM pending_hashes")
+            self.db.execute("DELETE FROM pending_hashes")
+            self.db.execute("DELETE FROM pending_diff")
+        return pending[0]
+
+    def close(self):
+        self.db.close()
+
+def write_diff(rows, output_file_name, cache, dialect="postgres", delete_batch_size=1000, buffer_size=1 << 20, ddl=""):
+    # Emit only what changed since the run recorded in cache, as one
+    # transaction: DELETEs for vanished rows (children first), then
+    # INSERT ... ON CONFLICT (id) DO UPDATE for new or changed rows in
+    # nesting order. Upserts are spooled because the deletes must precede
+    # them but are only known once every row has been seen. The new hashes
+    # are only staged; --diff-commit adopts them once the diff is applied.
+    upserted = 0
+    deleted = 0
+    with tempfile.SpooledTemporaryFile(max_size=4 << 20) as upserts:
+        for chunk in iter_chunks(rows):
+            statements = [format_upsert(table, row, dialect) for table, row in cache.changed(chunk)]
+            if statements:
+                upserts.write(("\n".join(statements) + "\n").encode("utf-8"))
+                upserted += len(statements)
+        with OutputStream(output_file_name, buffer_size) as f:
+            f.write(ddl.encode("utf-8"))
+            f.write(b"BEGIN;\n")
+            for table in reversed(TABLES):
+                for ids in iter_chunks(cache.deleted(table), delete_batch_size):
+                    f.write(f"DELETE FROM {table} WHERE id IN ({', '.join(escape_sql_string(i) for i in ids)});\n".encode("utf-8"))
+                    deleted += len(ids)
+            upserts.seek(0)
+            while block := upserts.read(1 << 20):
+                f.write(block)
+            f.write(b"COMMIT;\n")
+    cache.stage(output_file_name)
+    return upserted, deleted
+
+# Index advisor (--advise-indexes). The SQL the Express API sends is read
+# from the string literals in server/index.js: a pool.query() call with a
+# literal is one query, and one that passes a variable takes every literal
+# since that variable was declared, with each fragment holding a condition,
+# WHERE or ORDER BY clause. Columns compared with equality against a
+# parameter lead the key, then a single range column or, failing that, the
+# ORDER BY columns. Plain lookups on id, keys already indexed by the Prisma
+# schema or by the unique index an ON CONFLICT target needs (as a leading
+# prefix) and keys that prefix another advised index are skipped; join
+# probes into a table's id ride on the primary key. When a query names at
+# most COVERING_COLUMNS more columns of the indexed table and all of them
+# are narrow (numbers, timestamps, ids and enum values), they are added as
+# INCLUDE columns so it can be answered by an index-only scan; a query that
+# selects * (or alias.*) from the table reads every column and gets none.
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server", "index.js")
+
+JS_STRING = re.compile(r"""'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|`(?:[^`\\]|\\.)*`""")
+SQL_STATEMENT = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT)\b", re.I)
+SQL_TABLE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|SET|ORDER|RETURNING|LEFT|RIGHT|INNER|VALUES)\b)(\w+))?", re.I)
+SQL_PREDICATE = re.compile(r'(?:(\w+)\.)?"?(\w+)"?\s*(=|>=|<=|<|>)\s*\$', re.I)
+SQL_JOIN = re.compile(r'\bON\s+(\w+)\."?(\w+)"?\s*=\s*(\w+)\."?(\w+)"?', re.I)
+SQL_ORDER_BY = re.compile(r'\bORDER BY\s+((?:(?:\w+\.)?"?\w+"?(?:\s+(?:ASC|DESC))?\s*,?\s*)+)', re.I)
+SQL_SELECT_LIST = re.compile(r"^\s*SELECT\s+(.*?)\s+FROM\b", re.I | re.S)
+SQL_CONFLICT = re.compile(r"\bON CONFLICT\s*\(([^)]*)\)", re.I)
+COVERING_COLUMNS = 3
+
+def js_queries(path=SERVER_PATH):
+    # Yields (line, [SQL literal, ...]) per pool.query() call.
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    literals = [(m.start(), m[0][1:-1]) for m in JS_STRING.finditer(text)]
+    for call in re.finditer(r"pool\.query\(\s*", text):
+        line = text.count("\n", 0, call.start()) + 1
+        if text[call.end()] in "'\"`":
+            yield line, [next(value for start, value in literals if start == call.end())]
+            continue
+        name = re.match(r"\w+", text[call.end():])
+        declared = None
+        for declared in re.finditer(rf"\b(?:let|var|const)\s+{name[0]}\s*=", text[:call.start()]):
+            pass
+        if declared is not None:
+            yield line, [value for start, value in literals if declared.end() <= start < call.start()]
+
+def query_patterns(parts):
+    # Returns (table, equality columns, range column, order by, selected
+    # columns, join probes) for one query from its SQL literals, with
+    # columns as (table, column) pairs and order by as (table, column,
+    # direction) triples.
+    statement = next((part for part in parts if SQL_STATEMENT.match(part)), None)
+    if statement is None:
+        return None
+    aliases = {}
+    for table, alias in SQL_TABLE.findall(statement):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    table = SQL_TABLE.search(statement)[1]
+    clauses = [re.split(r"\bWHERE\b", statement, maxsplit=1, flags=re.I)[1] if re.search(r"\bWHERE\b", statement, re.I) else ""]
+    clauses += [part for part in parts if part is not statement]
+    equality, ranges, orders = [], [], []
+    for clause in clauses:
+        for alias, column, op in SQL_PREDICATE.findall(clause):
+            target = (aliases.get(alias, alias) if alias else table, column)
+            if op == "=" and target not in equality:
+                equality.append(target)
+            elif op != "=" and target not in ranges:
+                ranges.append(target)
+        for order in SQL_ORDER_BY.findall(clause):
+            columns = []
+            for term in order.split(","):
+                m = re.match(r'\s*(?:(\w+)\.)?"?(\w+)"?(?:\s+(ASC|DESC))?', term, re.I)
+                columns.append((aliases.get(m[1], m[1]) if m[1] else table, m[2], (m[3] or "").upper()))
+            orders.append(tuple(columns))
+    joins = []
+    for a, a_column, b, b_column in SQL_JOIN.findall(statement):
+        joins.append(((aliases.get(a, a), a_column), (aliases.get(b, b), b_column)))
+    # Columns named from the queried table; None when the select list has
+    # anything but (alias.)column and (alias.)* terms or reads all of the
+    # queried table's columns. Columns of joined tables come from their own
+    # indexes and are left out.
+    selected = None
+    if select := SQL_SELECT_LIST.match(statement):
+        selected = []
+        for term in select[1].split(","):
+            m = re.fullmatch(r'\s*(?:(\w+)\.)?("?\w+"?|\*)\s*', term)
+            source = aliases.get(m[1], m[1]) if m and m[1] else table
+            if m is None or (m[2] == "*" and (source == table or source not in TABLES)):
+                selected = None
+                break
+            if source == table:
+                selected.append((table, m[2].strip('"')))
+    # Alternative ORDER BYs (one per branch of a query builder) cannot
+    # share one index, so only a single ORDER BY is indexed.
+    return table, equality, ranges, orders[0] if len(orders) == 1 else (), selected, joins
+
+def schema_indexes(models):
+    # {table: [column tuple, ...]} for the @id, @unique, @@unique, @@id and
+    # @@index keys declared in the Prisma schema.
+    indexes = {table: list(keys) for table, keys in integrity_rules(models)[1].items()}
+    for table, (model_name, _) in TABLE_MODELS.items():
+        field_columns = {}
+        for column, _ in TABLES[table]:
+            field = model_field(models, table, column)
+            if field is not None:
+                field_columns[field.name] = column
+        for attribute in models[model_name].block_attributes:
+            if block := re.match(r"@@index\(\s*\[([^\]]*)\]", attribute):
+                names = [name.strip().split("(")[0] for name in block[1].split(",")]
+                if all(name in field_columns for name in names):
+                    indexes[table].append(tuple(field_columns[name] for name in names))
+    return indexes
+
+def advise_indexes(server_path=SERVER_PATH, schema_path=SCHEMA_PATH):
+    # Returns ([(table, key, include, [source line, ...]), ...] in load
+    # order, warnings). key holds (column, direction) pairs.
+    existing = schema_indexes(parse_prisma_schema(schema_path)[0])
+    candidates = {}
+    warnings = []
+    def propose(table, key, include, line):
+        if [column for column, _ in key] == ["id"]:
+            return
+        entry = candidates.setdefault((table, key), [include, []])
+        positions = COLUMN_INDEXES.get(table, {})
+        # Queries sharing a key share its INCLUDE list, up to the same cap.
+        merged = set(entry[0]) | set(include)
+        if len(merged) <= COVERING_COLUMNS:
+            entry[0] = sorted(merged, key=lambda column: (positions.get(column, len(positions)), column))
+        if line not in entry[1]:
+            entry[1].append(line)
+    for line, parts in js_queries(server_path):
+        patterns = query_patterns(parts)
+        if patterns is None:
+            continue
+        table, equality, ranges, order, selected, joins = patterns
+        for conflict in SQL_CONFLICT.findall(parts[0]):
+            existing.setdefault(table, []).append(tuple(column.strip().strip('"') for column in conflict.split(",")))
+        by_table = {}
+        for target, column in equality:
+            by_table.setdefault(target, []).append((column, ""))
+        for (a, a_column), (b, b_column) in joins:
+            # An equi-join probing a table's id uses its primary key; the
+            # other side needs the index otherwise.
+            if a_column != "id" and b_column != "id":
+                propose(a, ((a_column, ""),), [], line)
+                propose(b, ((b_column, ""),), [], line)
+        for target, key in by_table.items():
+            if target != table:
+                propose(target, tuple(key), [], line)
+                continue
+            if len(ranges) == 1 and ranges[0][0] == table:
+                key.append((ranges[0][1], ""))
+            elif order and all(t == table for t, _, _ in order):
+                key.extend((column, direction) for _, column, direction in order if (column, "") not in key)
+            include = []
+            if selected is not None:
+                include = list(dict.fromkeys(column for _, column in selected if column not in {c for c, _ in key}))
+                if len(include) > COVERING_COLUMNS or not all(is_narrow_column(table, column) for column in include):
+                    include = []
+            propose(table, tuple(key), include, line)
+        if not by_table and order and all(t == table for t, _, _ in order) and not ranges:
+            propose(table, tuple((column, direction) for _, column, direction in order), [], line)
+    advised = []
+    for (table, key), (include, lines) in candidates.items():
+        columns = tuple(column for column, _ in key)
+        if table in TABLES:
+            unknown = [column for column in (*columns, *include) if column not in COLUMN_INDEXES[table]]
+            if unknown:
+                warnings.append(f"{os.path.basename(server_path)}:{lines[0]}: {table} has no column {', '.join(unknown)}; skipped")
+                continue
+        if any(existing_key[:len(columns)] == columns for existing_key in existing.get(table, ())):
+            continue
+        if any(other_table == table and other_key != key and tuple(c for c, _ in other_key)[:len(columns)] == columns
+               for other_table, other_key in candidates):
+            continue
+        advised.append((table, key, include, lines))
+    order = {table: i for i, table in enumerate(TABLES)}
+    advised.sort(key=lambda index: (order.get(index[0], len(order)), index[0], index[1]))
+    return advised, warnings
+
+def is_narrow_column(table, column):
+    kind = dict(TABLES.get(table, ())).get(column)
+    if kind == "text":
+        return column == "id" or is_repeated_column(column, kind)
+    return kind in ("int", "float", "timestamp")
+
+def index_name(table, key):
+    return f"{table}_{'_'.join(column for column, _ in key)}_idx"[:63]
+
+def format_index_script(advised, server_path=SERVER_PATH):
+    lines = [
+        f"-- Indexes for the query patterns in {os.path.basename(server_path)}, from generate_sql.py --advise-indexes.",
+        "-- Run this after the bulk load: building each index once over the loaded",
+        "-- rows is much cheaper than maintaining it row by row during the load.",
+        "-- Tables the seed data does not create are only indexed if they exist.",
+        "SET maintenance_work_mem = '512MB';",
+    ]
+    for table, key, include, source_lines in advised:
+        columns = ", ".join(f"{quote_column(column)}{' ' + direction if direction else ''}" for column, direction in key)
+        statement = f"CREATE INDEX IF NOT EXISTS {index_name(table, key)} ON {table} ({columns})"
+        if include:
+            statement += f" INCLUDE ({', '.join(quote_column(column) for column in include)})"
+        lines.append(f"-- {os.path.basename(server_path)}:{', '.join(map(str, source_lines))}")
+        if table in TABLES:
+            lines.append(f"{statement};")
+        else:
+            lines.append(f"DO $$ BEGIN IF to_regclass('{table}') IS NOT NULL THEN EXECUTE {escape_sql_string(statement)}; END IF; END $$;")
+    tables = [table for table in dict.fromkeys(table for table, _, _, _ in advised) if table in TABLES]
+    if tables:
+        lines.append(f"ANALYZE {', '.join(tables)};")
+    return "\n".join(lines) + "\n"
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+def parse_size(value):
+    # "1048576", "512K", "256M", "1G" (binary units, optional trailing B).
+    match = re.fullmatch(r"(\d+)\s*([KMG]?)B?", value.strip(), re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    return int(match[1]) * SIZE_UNITS[match[2].upper()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate SQL seed data for the project management database.")
+    parser.add_argument("-o", "--output",
+                        help="file to write ('-' for stdout; only --format insert streams as it is generated), directory for --format binary or --shard-size, or database "
+                             "for --format sqlite "
+                             "(default: insert_dummy_data.sql / insert_dummy_data_pgcopy / insert_dummy_data_shards / "
+                             "insert_dummy_data.db)")
+    parser.add_argument("--format", choices=tuple(SINKS), default="insert",
+                        help="insert: one INSERT per row in nesting order; batched: multi-row INSERTs grouped by table; "
+                             "copy: one COPY FROM STDIN block per table; binary: a PGCOPY file per table plus load.sql; "
+                             "sqlite: create the tables and load the rows directly into a SQLite database")
+    parser.add_argument("--shard-size", type=parse_size, metavar="SIZE",
+                        help="write batched, copy or binary output as a directory of per-table shards of at most SIZE "
+                             "uncompressed bytes (e.g. 256M), with a manifest.json and a parallel load.sh")
+    parser.add_argument("--compress", choices=tuple(COMPRESSORS),
+                        help="compress every shard in a background thread (zstd needs the zstandard package)")
+    parser.add_argument("--compress-level", type=int, metavar="N", help="compression level (default: 6 for gzip, 3 for zstd)")
+    parser.add_argument("--fast-load", action="store_true",
+                        help="wrap the load in one transaction with synchronous_commit off, dropping foreign keys, unique "
+                             "constraints and secondary indexes of the seeded tables first and rebuilding them (and "
+                             "running ANALYZE) at the end; the definitions are read from the database catalog")
+    parser.add_argument("--load", metavar="DSN",
+                        help="instead of writing a file, COPY the data into the PostgreSQL database at DSN, loading tables "
+                             "in foreign-key order over a pool of connections (needs the psycopg package)")
+    parser.add_argument("--connections", type=int, default=4, metavar="N", help="--load connection pool size (default: %(default)s)")
+    parser.add_argument("--load-shard-rows", type=int, default=100000, metavar="N",
+                        help="--load rows per COPY; the shards of a table load concurrently (default: %(default)s)")
+    parser.add_argument("--truncate", action="store_true",
+                        help="with --load, TRUNCATE the seeded tables first; fails if a table outside the seed references them")
+    parser.add_argument("--dialect", choices=tuple(DIALECT_INSERT_EXPRESSIONS), default="postgres",
+                        help="SQL dialect of insert, batched and --diff output (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT statement in batched mode (default: %(default)s)")
+    parser.add_argument("--transaction-every", type=int, default=0, metavar="N",
+                        help="in batched mode, wrap every N statements in BEGIN/COMMIT (default: no explicit transactions)")
+    parser.add_argument("-i", "--input", metavar="PATH",
+                        help="read users and workspaces from PATH ('-' for stdin) instead of the built-in dummy data")
+    parser.add_argument("--input-format", choices=("auto", *INPUT_READERS), default="auto",
+                        help="js: export const dummyUsers/dummyWorkspaces module; json: {\"users\": [...], \"workspaces\": [...]}; "
+                             "ndjson: one {\"user\": ...} or {\"workspace\": ...} per line "
+                             "(default: by file extension, json for stdin)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="generate a deterministic scale-out dataset instead of the built-in dummy data")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --synthetic (default: %(default)s)")
+    for knob, default in SYNTHETIC_DEFAULTS.items():
+        parser.add_argument(f"--{knob.replace('_', '-')}", type=int, default=default, metavar="N",
+                            help=f"--synthetic: number of {knob.replace('_', ' ')} (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help=f"encode the rows in N worker processes, in chunks of {CHUNK_ROWS:,} rows (default: %(default)s)")
+    parser.add_argument("--snapshot-cache", nargs="?", const=os.path.join(".seed_cache", "snapshots"), metavar="DIR",
+                        help="reuse the parsed and normalized input from DIR when the input is unchanged, and store it "
+                             "there otherwise (default: %(const)s)")
+    parser.add_argument("--rollups", action="store_true",
+                        help="also emit book_stats and workspace_stats: per book and workspace task counts by status, "
+                             "type, priority and due-date bucket, and royalty totals; the output creates the two "
+                             "tables if they do not exist")
+    parser.add_argument("--rollup-as-of", metavar="TIMESTAMP",
+                        help="ISO 8601 time the --rollups due-date buckets are relative to (default: the latest updated_at "
+                             "of each workspace's rows, so the same input gives the same rollups)")
+    parser.add_argument("--subset-workspace", action="append", default=[], metavar="ID",
+                        help="only emit this workspace and the rows reachable from it through foreign keys, including the "
+                             "users they reference (repeatable)")
+    parser.add_argument("--subset-book", action="append", default=[], metavar="ID",
+                        help="only emit this book, its workspace row and the rows reachable from the book (repeatable)")
+    parser.add_argument("--cluster", action="store_true",
+                        help="emit every table sorted by its clustering key (e.g. tasks by book_id, id), table by table, "
+                             "using an external merge sort, so the loaded heap is physically clustered; load each table "
+                             "in one session to keep that order")
+    parser.add_argument("--cluster-key", action="append", type=parse_cluster_key, default=[], metavar="TABLE=COLUMNS",
+                        help="clustering key for a table, e.g. tasks=book_id,id (repeatable; implies --cluster)")
+    parser.add_argument("--sort-memory", type=parse_size, default=256 << 20, metavar="SIZE",
+                        help="approximate memory for --cluster before sorted runs spill to disk (default: 256M)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="also write an NDJSON request trace for the Express API that references the generated ids; "
+                             "replay it with replay_trace.py")
+    parser.add_argument("--trace-requests", type=int, default=100000, metavar="N", help="requests in the trace (default: %(default)s)")
+    parser.add_argument("--trace-write-ratio", type=float, default=0.1, metavar="F",
+                        help="fraction of trace requests that are writes (default: %(default)s)")
+    parser.add_argument("--trace-zipf", type=float, default=1.1, metavar="S",
+                        help="Zipf exponent of entity popularity in the trace; 0 is uniform (default: %(default)s)")
+    parser.add_argument("--trace-rate", type=float, default=200.0, metavar="R",
+                        help="mean trace arrival rate in requests per second (default: %(default)s)")
+    parser.add_argument("--trace-pool", type=int, default=100000, metavar="N",
+                        help="entities per table sampled from the data for the trace (default: %(default)s)")
+    parser.add_argument("--diff", action="store_true",
+                        help="emit only rows added, changed or removed since the last committed --diff run, as upserts and "
+                             "deletes")
+    parser.add_argument("--diff-commit", action="store_true",
+                        help="after the last --diff output has been applied, make it the baseline of the next --diff")
+    parser.add_argument("--hash-cache", default=os.path.join(".seed_cache", "hashes.sqlite"), metavar="PATH",
+                        help="per-entity content hash store used by --diff and --diff-commit (default: %(default)s)")
+    parser.add_argument("--stats", action="store_true",
+                        help="time the parse, generate, encode and write stages and print per-table counts")
+    parser.add_argument("--stats-file", metavar="PATH", help="also write the --stats report as JSON to PATH (implies --stats)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --stats, record the tracemalloc peak of this process (slows the run down)")
+    parser.add_argument("--profile", metavar="PATH", help="run under cProfile and write pstats data to PATH")
+    parser.add_argument("--validate", nargs="?", const=SCHEMA_PATH, metavar="SCHEMA",
+                        help="check foreign keys, unique keys and cross-row rules from the Prisma schema in one pass "
+                             "before writing anything, and abort on violations (default schema: %(const)s)")
+    parser.add_argument("--validate-only", action="store_true", help="with --validate, stop after validating")
+    parser.add_argument("--advise-indexes", nargs="?", const=SERVER_PATH, metavar="SERVER_JS",
+                        help="derive supporting indexes from the queries in the Express server and the Prisma schema and "
+                             "write them as a CREATE INDEX script to run after the load, then exit (default: %(const)s)")
+    parser.add_argument("--check-schema", nargs="?", const=SCHEMA_PATH, metavar="PATH",
+                        help="compare the table layout against a Prisma schema and exit (default: %(const)s)")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.synthetic and args.input:
+        parser.error("--synthetic and --input are mutually exclusive")
+    if args.diff and (args.format != "insert" or args.jobs > 1):
+        parser.error("--diff writes per-row upserts serially; it cannot be combined with --format or --jobs")
+    if args.diff_commit and args.diff:
+        parser.error("--diff-commit adopts an earlier --diff once it has been applied; run it on its own")
+    for knob in SYNTHETIC_DEFAULTS:
+        if getattr(args, knob) < 0:
+            parser.error(f"--{knob.replace('_', '-')} must not be negative")
+    if args.synthetic and args.workspaces and (args.users < 1 or args.members_per_workspace < 1):
+        parser.error("--users and --members-per-workspace must be at least 1 when generating workspaces")
+    if args.synthetic and args.books_per_workspace and args.members_per_book < 1:
+        parser.error("--members-per-book must be at least 1 when generating books")
+    if args.dialect != "postgres" and args.format not in ("insert", "batched"):
+        parser.error(f"--format {args.format} is PostgreSQL-only; --dialect applies to insert and batched output")
+    args.sharded = args.shard_size is not None or args.compress is not None
+    if args.sharded and (args.format not in ("batched", "copy", "binary") or args.diff):
+        parser.error("--shard-size and --compress apply to --format batched, copy or binary")
+    if args.sharded and args.dialect != "postgres":
+        parser.error("sharded output is loaded with psql; it does not support --dialect")
+    if args.shard_size is not None and args.shard_size < 1:
+        parser.error("--shard-size must be positive")
+    if args.compress == "zstd" and zstandard is None:
+        parser.error("--compress zstd needs the zstandard package")
+    if args.compress_level is not None and not args.compress:
+        parser.error("--compress-level requires --compress")
+    if args.fast_load and (args.format not in ("insert", "batched", "copy", "binary") or args.sharded or args.diff
+                           or args.dialect != "postgres"):
+        parser.error("--fast-load wraps a single PostgreSQL load; use it with --format insert, batched, copy or binary")
+    if args.fast_load and args.transaction_every:
+        parser.error("--fast-load runs the whole load in one transaction; it cannot be combined with --transaction-every")
+    if args.snapshot_cache and (args.synthetic or args.input == "-"):
+        parser.error("--snapshot-cache needs a file or the built-in dummy data as input")
+    args.cluster = args.cluster or bool(args.cluster_key)
+    if args.cluster and args.jobs > 1:
+        parser.error("--cluster sorts a single stream; it cannot be combined with --jobs")
+    if args.trace and args.jobs > 1:
+        parser.error("--trace samples the ids in this process; it cannot be combined with --jobs")
+    if args.trace and args.trace == args.output:
+        parser.error("--trace and --output must be different files")
+    if args.trace_requests < 0 or args.trace_pool < 1 or args.trace_rate <= 0 or args.trace_zipf < 0:
+        parser.error("--trace-requests, --trace-pool, --trace-rate and --trace-zipf must be positive")
+    if not 0 <= args.trace_write_ratio <= 1:
+        parser.error("--trace-write-ratio must be between 0 and 1")
+    args.subset = bool(args.subset_workspace or args.subset_book)
+    if args.subset and args.jobs > 1:
+        parser.error("--subset-workspace and --subset-book filter a single stream; they cannot be combined with --jobs")
+    if args.rollup_as_of is not None and not args.rollups:
+        parser.error("--rollup-as-of requires --rollups")
+    if args.rollup_as_of is not None:
+        try:
+            as_of = datetime.fromisoformat(args.rollup_as_of)
+        except ValueError:
+            parser.error(f"--rollup-as-of: invalid ISO 8601 timestamp {args.rollup_as_of!r}")
+        args.rollup_as_of = iso_timestamp((as_of if as_of.tzinfo else as_of.replace(tzinfo=timezone.utc)).astimezone(timezone.utc))
+    if args.validate_only and not args.validate:
+        args.validate = SCHEMA_PATH
+    if args.validate and not args.validate_only and args.input == "-":
+        parser.error("stdin cannot be read twice; use --validate-only to validate it")
+    args.stats = args.stats or bool(args.stats_file)
+    if args.trace_memory and not args.stats:
+        parser.error("--trace-memory requires --stats")
+    if args.stats and args.diff:
+        parser.error("--stats is not supported with --diff")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.transaction_every < 0:
+        parser.error("--transaction-every must not be negative")
+    if args.load and (args.output is not None or args.format != "insert" or args.sharded or args.diff or args.fast_load
+                      or args.dialect != "postgres"):
+        parser.error("--load COPYs straight into the database; it takes no output, format or envelope options")
+    if args.load and psycopg is None:
+        parser.error("--load needs the psycopg package")
+    if args.connections < 1 or args.load_shard_rows < 1:
+        parser.error("--connections and --load-shard-rows must be at least 1")
+    if args.truncate and not args.load:
+        parser.error("--truncate requires --load")
+    if args.output == "-" and (args.format in ("binary", "sqlite") or args.sharded):
+        parser.error("only insert, batched, copy and --diff output can be written to stdout")
+    if args.output is None and args.advise_indexes:
+        args.output = "create_indexes.sql"
+    if args.output is None and args.sharded:
+        args.output = "insert_dummy_data_shards"
+    if args.output is None:
+        args.output = {"binary": "insert_dummy_data_pgcopy", "sqlite": "insert_dummy_data.db"}.get(args.format, "insert_dummy_data.sql")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(run, args)
+            finally:
+                profiler.dump_stats(args.profile)
+        else:
+            run(args)
+    except BrokenPipeError:
+        # The reader of stdout or the pipe (e.g. psql) exited early. Point
+        # stdout at /dev/null so the interpreter's final flush stays quiet.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit("generate_sql.py: output pipe closed before all rows were written")
+
+def open_records(args):
+    if args.input is None:
+        return iter_js_records(io.StringIO(dummy_data))
+    return read_input(args.input, args.input_format)
+
+def run(args):
+    if args.check_schema:
+        errors, warnings = schema_mismatches(*parse_prisma_schema(args.check_schema))
+        for message in warnings:
+            print(f"warning: {message}")
+        for message in errors:
+            print(f"error: {message}")
+        sys.exit(1 if errors else 0)
+    # With the SQL going to stdout, progress and reports go to stderr.
+    log = sys.stderr if args.output == "-" else sys.stdout
+    if args.output == "-" and (args.diff or args.format in ("batched", "copy")) and not args.advise_indexes:
+        print(f"warning: {'--diff' if args.diff else f'--format {args.format}'} output is regrouped and only written once the "
+              "input has been read to the end; use --format insert to stream into psql", file=sys.stderr)
+    if args.advise_indexes:
+        advised, warnings = advise_indexes(args.advise_indexes)
+        for message in warnings:
+            print(f"warning: {message}", file=log)
+        with OutputStream(args.output) as f:
+            f.write(format_index_script(advised, args.advise_indexes).encode("utf-8"))
+        print(f"{len(advised)} indexes written to {args.output}", file=log)
+        return
+    if args.diff_commit:
+        cache = EntityHashCache(args.hash_cache)
+        try:
+            committed = cache.commit()
+        finally:
+            cache.close()
+        if committed is None:
+            sys.exit(f"generate_sql.py: no pending --diff in {args.hash_cache} to commit")
+        print(f"Hashes of {committed} are now the --diff baseline", file=log)
+        return
+    if args.validate:
+        foreign_keys, unique_keys, warnings = integrity_rules(parse_prisma_schema(args.validate)[0])
+        for message in warnings:
+            print(f"warning: {message}", file=log)
+        validator = IntegrityValidator(foreign_keys, unique_keys)
+        if args.synthetic:
+            validator.check(shard_rows(synthetic_shards(args.seed, **{knob: getattr(args, knob) for knob in SYNTHETIC_DEFAULTS})))
+        else:
+            validator.check(validation_rows(open_records(args), validator))
+        violations = validator.finish()
+        if violations:
+            print(format_violations(violations), file=log)
+            sys.exit(1)
+        print("No integrity violations found", file=log)
+        if args.validate_only:
+            return
+    stats = RunStats(args.trace_memory) if args.stats else None
+    if stats is not None:
+        stats.start()
+    if args.synthetic:
+        shards = synthetic_shards(args.seed, **{knob: getattr(args, knob) for knob in SYNTHETIC_DEFAULTS})
+    else:
+        records = open_records(args)
+        if stats is not None:
+            records = stats.timed("parse", records)
+        if args.snapshot_cache:
+            input_format = "js" if args.input is None else resolve_input_format(args.input, args.input_format)
+            shards = snapshot_shards(records, args.input, input_format, args.snapshot_cache)
+            if stats is not None:
+                shards = stats.timed("snapshot", shards)
+        else:
+            shards = record_shards(records)
+    if args.rollups:
+        shards = rollup_shards(shards, args.rollup_as_of)
+    subset = None
+    if args.subset:
+        subset = Subset(args.subset_workspace, args.subset_book)
+        shards = [(subset_rows, (subset, shards), {})]
+    clustered = None
+    if args.cluster:
+        clustered = ClusteredTables({**CLUSTER_KEYS, **dict(args.cluster_key)}, args.sort_memory)
+        shards = [(clustered_rows, (clustered, shards), {})]
+    sampler = None
+    if args.trace:
+        sampler = TraceSampler(args.trace_pool, args.seed)
+        shards = [(traced_rows, (sampler, shards), {})]
+    def report_stream():
+        if subset is not None:
+            print(format_subset(subset), file=log)
+        if clustered is not None:
+            print(f"Clustered {len(clustered.columns)} tables, {clustered.spilled:,} rows spilled to sorted runs", file=log)
+        if sampler is not None:
+            written = sampler.write(args.trace, args.trace_requests, args.trace_write_ratio, args.trace_zipf, args.trace_rate)
+            print(f"Request trace written to {args.trace} ({written} requests)", file=log)
+    def report_stats(fmt, count):
+        if stats is None:
+            return
+        stats.stop()
+        report = stats.report(format=fmt, jobs=args.jobs, rows=count)
+        print(format_stats(report), file=log)
+        if args.stats_file:
+            with open(args.stats_file, "w") as f:
+                json.dump(report, f, indent=2)
+    output_file_name = args.output
+    ddl = rollup_ddl(args.dialect) if args.rollups else ""
+    started = time.perf_counter()
+    if args.diff:
+        cache = EntityHashCache(args.hash_cache)
+        try:
+            upserted, deleted = write_diff(shard_rows(shards), output_file_name, cache, args.dialect, ddl=ddl)
+        finally:
+            cache.close()
+        print(f"SQL diff written to {output_file_name} ({upserted} upserts, {deleted} deletes in {time.perf_counter() - started:.2f}s); "
+              "run --diff-commit once it has been applied", file=log)
+        report_stream()
+        return
+    if args.load:
+        sink = PostgresLoader(args.load, connections=args.connections, shard_rows=args.load_shard_rows, truncate=args.truncate,
+                              ddl=ddl)
+        count = write_shards("binary", shards, sink, jobs=args.jobs, stats=stats)
+        elapsed = time.perf_counter() - started
+        print(f"Loaded {count} rows in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} rows/s) over {args.connections} connections", file=log)
+        for table, table_stats in sink.report.items():
+            print(f"  {table:<20} {table_stats['rows']:>10,} rows {table_stats['shards']:>4} shards {table_stats['seconds']:8.2f}s "
+                  f"{table_stats['rows_per_s']:>12,.0f} rows/s {table_stats['mb_per_s']:8.1f} MB/s", file=log)
+        report_stream()
+        report_stats("binary", count)
+        return
+    if args.sharded:
+        sink = ShardedSink(args.format, output_file_name, shard_size=args.shard_size, compress=args.compress,
+                           compress_level=args.compress_level, batch_size=args.batch_size,
+                           transaction_every=args.transaction_every, ddl=ddl)
+    else:
+        sink = SINKS[args.format](output_file_name, batch_size=args.batch_size, transaction_every=args.transaction_every,
+                                  fast_load=args.fast_load, ddl=ddl)
+    count = write_shards(args.format, shards, sink, jobs=args.jobs, dialect=args.dialect, stats=stats)
+    elapsed = time.perf_counter() - started
+    print(f"SQL {args.format} output written to {output_file_name} ({count} rows in {elapsed:.2f}s, {count / max(elapsed, 1e-9):,.0f} rows/s)", file=log)
+    report_stream()
+    report_stats(args.format, count)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import http.client
+import json
+import queue
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Replays an NDJSON request trace written by generate_sql.py --trace against
+# a running Express server (npm start in server/) and reports latency
+# percentiles per route. Writes in the trace really modify the database.
+
+PERCENTILES = (50, 90, 95, 99)
+
+def read_trace(path, limit=None):
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for i, line in enumerate(f):
+            if limit is not None and i >= limit:
+                break
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list.
+    if not values:
+        return None
+    return values[max(0, -(-len(values) * p // 100) - 1)]
+
+def status_class(status):
+    return "error" if status is None else f"{status // 100}xx"
+
+def replay(requests, base_url, concurrency=8, speed=1.0, timeout=30.0):
+    # With speed > 0 the replay is open-loop: each request is due at its
+    # trace offset divided by speed, and its latency is measured from that
+    # due time, so time spent queued behind a slow server is counted rather
+    # than hidden (no coordinated omission). With speed 0 requests are sent
+    # as fast as the workers go and latency is measured from the send.
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip("/")
+    jobs = queue.Queue(maxsize=concurrency * 4)
+    routes = {}
+    lock = threading.Lock()
+
+    def connect():
+        if url.scheme == "https":
+            conn = http.client.HTTPSConnection(url.hostname, url.port or 443, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        try:
+            # Small requests must not wait on Nagle's algorithm.
+            conn.connect()
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            conn.close()
+        return conn
+
+    def worker():
+        conn = connect()
+        while (job := jobs.get()) is not None:
+            due, request = job
+            body = None
+            headers = {}
+            if "body" in request:
+                body = json.dumps(request["body"]).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            sent = time.perf_counter()
+            try:
+                conn.request(request["method"], prefix + request["path"], body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = connect()
+                status = None
+            latency = time.perf_counter() - (sent if due is None else due)
+            with lock:
+                stats = routes.setdefault(request["route"], {"latencies": [], "statuses": {}})
+                stats["latencies"].append(latency)
+                key = status_class(status)
+                stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    try:
+        for request in requests:
+            due = None
+            if speed:
+                due = started + request["t"] / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            jobs.put((due, request))
+    finally:
+        for _ in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+    return routes, time.perf_counter() - started
+
+def summarize(routes, elapsed):
+    summary = {"wall_s": elapsed, "requests": 0, "routes": {}}
+    for route, stats in sorted(routes.items()):
+        latencies = sorted(stats["latencies"])
+        summary["requests"] += len(latencies)
+        summary["routes"][route] = {
+            "requests": len(latencies),
+            "statuses": dict(sorted(stats["statuses"].items())),
+            **{f"p{p}_ms": percentile(latencies, p) * 1000 for p in PERCENTILES},
+            "max_ms": latencies[-1] * 1000,
+        }
+    summary["requests_per_s"] = summary["requests"] / max(elapsed, 1e-9)
+    return summary
+
+def format_summary(summary):
+    header = f"{'route':<42} {'n':>7} {'2xx':>7} {'other':>6} " + " ".join(f"{f'p{p}':>8}" for p in PERCENTILES) + f" {'max':>8}"
+    lines = [header]
+    for route, stats in summary["routes"].items():
+        ok = stats["statuses"].get("2xx", 0)
+        lines.append(f"{route:<42} {stats['requests']:>7} {ok:>7} {stats['requests'] - ok:>6} "
+                     + " ".join(f"{stats[f'p{p}_ms']:8.1f}" for p in PERCENTILES) + f" {stats['max_ms']:8.1f}")
+    lines.append(f"{summary['requests']} requests in {summary['wall_s']:.2f}s ({summary['requests_per_s']:,.0f} req/s); latencies in ms")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a generate_sql.py --trace request trace against the Express server "
+                                                 "and report latency percentiles per route.")
+    parser.add_argument("trace", help="NDJSON trace file ('-' for stdin)")
+    parser.add_argument("--base-url", default="http://localhost:5000", help="server to drive (default: %(default)s)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, metavar="N",
+                        help="concurrent keep-alive connections (default: %(default)s)")
+    parser.add_argument("--speed", type=float, default=1.0, metavar="X",
+                        help="replay at X times the trace's arrival rate; 0 sends as fast as possible (default: %(default)s)")
+    parser.add_argument("--limit", type=int, metavar="N", help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=30.0, metavar="SECONDS", help="per-request timeout (default: %(default)s)")
+    parser.add_argument("-o", "--output", metavar="PATH", help="also write the summary as JSON to PATH")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.speed < 0:
+        parser.error("--speed must not be negative")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    routes, elapsed = replay(read_trace(args.trace, args.limit), args.base_url, args.concurrency, args.speed, args.timeout)
+    summary = summarize(routes, elapsed)
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from unittest import mock
+
+import generate_sql
+
+# Tests that need no database: byte-level output, the single-stream modes and
+# the input readers. Run with python -m unittest (or pytest).
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(ROOT, "generate_sql.py")
+
+PEAK_RSS = """
+import resource, subprocess, sys
+subprocess.run(sys.argv[1:], check=True, stdout=subprocess.DEVNULL)
+rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(rss if sys.platform == "darwin" else rss * 1024)
+"""
+
+def run_main(*argv):
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_sql.main(list(argv))
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def peak_rss(*argv):
+    # Peak RSS in bytes of one run of the script in a fresh interpreter.
+    completed = subprocess.run([sys.executable, "-c", PEAK_RSS, sys.executable, SCRIPT, *argv],
+                               check=True, stdout=subprocess.PIPE, text=True)
+    return int(completed.stdout)
+
+def write_ndjson(path, copies):
+    # The dummy users, then copies of the dummy workspaces.
+    records = list(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+    with open(path, "w", encoding="utf-8") as f:
+        for kind, obj in records:
+            if kind == "user":
+                f.write(json.dumps({kind: obj}) + "\n")
+        for _ in range(copies):
+            for kind, obj in records:
+                if kind == "workspace":
+                    f.write(json.dumps({kind: obj}) + "\n")
+
+# Free text that every text format has to escape one way or another.
+AWKWARD_TEXT = "tab\there, new\nline, cr\r, back\\slash \\N, 'single' \"double\" {brace}, NULL, \u00fcn\u00efc\u00f6de \u2603"
+
+def write_awkward_input(path):
+    # The dummy data with awkward strings in the free-text, jsonb and array
+    # columns.
+    with open(path, "w", encoding="utf-8") as f:
+        for kind, obj in generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)):
+            if kind == "workspace":
+                obj["description"] = AWKWARD_TEXT
+                obj["settings"] = {AWKWARD_TEXT: [AWKWARD_TEXT, None, 1.5]}
+                for book in obj["books"]:
+                    book["description"] = AWKWARD_TEXT
+                    for plan in book.get("launchPlans", ()):
+                        plan["promotionChannels"] = [AWKWARD_TEXT, "", "NULL", None]
+                        plan["notes"] = None
+            f.write(json.dumps({kind: obj}) + "\n")
+
+def input_rows(path):
+    return list(generate_sql.shard_rows(generate_sql.record_shards(generate_sql.read_input(path))))
+
+def timestamp(value):
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+
+def normalize(table, row):
+    # The values a database would hold for row: None is a jsonb null and an
+    # empty array, as every format writes it, and timestamps are instants.
+    values = []
+    for (_, kind), value in zip(generate_sql.TABLES[table], row):
+        if kind == "text[]":
+            value = list(value or [])
+        elif kind == "timestamp" and value is not None:
+            value = timestamp(value)
+        elif kind == "text" and value is not None:
+            value = str(value)
+        values.append(value)
+    return tuple(values)
+
+def rows_by_table(rows):
+    tables = {}
+    for table, row in rows:
+        tables.setdefault(table, []).append(normalize(table, row))
+    return tables
+
+COPY_UNESCAPES = {"n": "\n", "r": "\r", "t": "\t", "\\": "\\"}
+
+def parse_text_array(text):
+    # An array literal as copy_text_array writes it: {} or quoted elements
+    # and NULLs.
+    items = []
+    i = 1
+    while text[i] != "}":
+        if text.startswith("NULL", i):
+            items.append(None)
+            i += 4
+        else:
+            i += 1
+            item = []
+            while text[i] != '"':
+                if text[i] == "\\":
+                    i += 1
+                item.append(text[i])
+                i += 1
+            items.append("".join(item))
+            i += 1
+        if text[i] == ",":
+            i += 1
+    return items
+
+COPY_DECODERS = {
+    "text": str,
+    "timestamp": timestamp,
+    "int": int,
+    "float": float,
+    "jsonb": json.loads,
+    "text[]": parse_text_array,
+}
+
+def parse_copy(text):
+    # {table: [row, ...]} from COPY ... FROM STDIN blocks.
+    tables = {}
+    lines = iter(text.split("\n"))
+    for line in lines:
+        if not line:
+            continue
+        table = re.match(r"COPY (\w+) ", line).group(1)
+        kinds = [kind for _, kind in generate_sql.TABLES[table]]
+        rows = tables.setdefault(table, [])
+        for line in lines:
+            if line == "\\.":
+                break
+            fields = line.split("\t")
+            rows.append(tuple(None if field == "\\N" else COPY_DECODERS[kind](re.sub(r"\\(.)", lambda m: COPY_UNESCAPES[m.group(1)], field))
+                              for kind, field in zip(kinds, fields, strict=True)))
+    return tables
+
+def parse_pgcopy_array(data):
+    ndim, _, _ = struct.unpack_from(">iii", data)
+    if ndim == 0:
+        return []
+    count, _ = struct.unpack_from(">ii", data, 12)
+    items, pos = [], 20
+    for _ in range(count):
+        (length,) = struct.unpack_from(">i", data, pos)
+        pos += 4
+        if length < 0:
+            items.append(None)
+        else:
+            items.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+    return items
+
+def parse_pgcopy_jsonb(data):
+    assert data[0] == 1
+    return json.loads(data[1:])
+
+PGCOPY_DECODERS = {
+    "text": lambda data: data.decode("utf-8"),
+    "timestamp": lambda data: generate_sql.PG_EPOCH + timedelta(microseconds=struct.unpack(">q", data)[0]),
+    "int": lambda data: struct.unpack(">i", data)[0],
+    "float": lambda data: struct.unpack(">d", data)[0],
+    "jsonb": parse_pgcopy_jsonb,
+    "text[]": parse_pgcopy_array,
+}
+
+def parse_pgcopy(table, data):
+    # The rows of one binary COPY file.
+    kinds = [kind for _, kind in generate_sql.TABLES[table]]
+    assert data.startswith(generate_sql.PGCOPY_HEADER) and data.endswith(generate_sql.PGCOPY_TRAILER)
+    rows, pos = [], len(generate_sql.PGCOPY_HEADER)
+    while True:
+        (count,) = struct.unpack_from(">h", data, pos)
+        pos += 2
+        if count == -1:
+            break
+        assert count == len(kinds)
+        row = []
+        for kind in kinds:
+            (length,) = struct.unpack_from(">i", data, pos)
+            pos += 4
+            if length < 0:
+                row.append(None)
+            else:
+                row.append(PGCOPY_DECODERS[kind](data[pos:pos + length]))
+                pos += length
+        rows.append(tuple(row))
+    assert pos == len(data)
+    return rows
+
+def write_records(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for kind, obj in records:
+            f.write(json.dumps({kind: obj}) + "\n")
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+class DefaultOutputTest(TempDirTestCase):
+    def test_matches_checked_in_seed(self):
+        output = self.path("out.sql")
+        run_main("-o", output)
+        self.assertEqual(read_bytes(output), read_bytes(os.path.join(ROOT, "insert_dummy_data.sql")))
+
+class CopyFormatTest(TempDirTestCase):
+    def test_round_trip(self):
+        input_path = self.path("input.ndjson")
+        write_awkward_input(input_path)
+        output = self.path("out.sql")
+        run_main("-i", input_path, "--format", "copy", "-o", output)
+        with open(output, encoding="utf-8") as f:
+            self.assertEqual(parse_copy(f.read()), rows_by_table(input_rows(input_path)))
+
+class BinaryFormatTest(TempDirTestCase):
+    def test_round_trip(self):
+        input_path = self.path("input.ndjson")
+        write_awkward_input(input_path)
+        output = self.path("out")
+        run_main("-i", input_path, "--format", "binary", "-o", output)
+        tables = {name[:-len(".pgcopy")]: parse_pgcopy(name[:-len(".pgcopy")], read_bytes(os.path.join(output, name)))
+                  for name in os.listdir(output) if name.endswith(".pgcopy")}
+        self.assertEqual(tables, rows_by_table(input_rows(input_path)))
+
+class JsonStreamReaderTest(unittest.TestCase):
+    CHUNK_SIZES = (1, 2, 3, 7, 64, 1000, 1 << 16)
+
+    def read_with_chunk_sizes(self, reader, text):
+        results = []
+        for size in self.CHUNK_SIZES:
+            with mock.patch.object(generate_sql, "JsonStreamReader", partial(generate_sql.JsonStreamReader, chunk_size=size)):
+                results.append(list(reader(io.StringIO(text))))
+        return results
+
+    def test_js_module(self):
+        expected = list(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+        for records in self.read_with_chunk_sizes(generate_sql.iter_js_records, generate_sql.dummy_data):
+            self.assertEqual(records, expected)
+
+    def test_json_document(self):
+        # Numbers, escapes and non-ASCII text land on every buffer boundary.
+        records = list(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+        document = {"users": [obj for kind, obj in records if kind == "user"],
+                    "workspaces": [{**obj, "description": AWKWARD_TEXT, "settings": {"n": [12345, -0.5, 1e21]}}
+                                   for kind, obj in records if kind == "workspace"]}
+        expected = [("user", obj) for obj in document["users"]] + [("workspace", obj) for obj in document["workspaces"]]
+        for text in (json.dumps(document), json.dumps(document, indent=2, ensure_ascii=False)):
+            for records in self.read_with_chunk_sizes(generate_sql.iter_json_records, text):
+                self.assertEqual(records, expected)
+
+    def test_bare_numbers(self):
+        # A number cut off by the end of the buffer may go on in the next read.
+        for size in self.CHUNK_SIZES:
+            reader = generate_sql.JsonStreamReader(io.StringIO("[123456789, -0.125e3, 7]"), chunk_size=size)
+            self.assertEqual(list(reader.iter_array()), [123456789, -125.0, 7])
+
+class ClusterTest(TempDirTestCase):
+    SYNTHETIC = ("--synthetic", "--users", "200", "--workspaces", "3")
+
+    def test_tables_are_sorted_by_their_keys(self):
+        # A 64K sort budget spills runs to disk for the larger tables.
+        keys = {**generate_sql.CLUSTER_KEYS, "tasks": ("status", "due_date", "id")}
+        for name, cluster in (("plain.sql", ()), ("clustered.sql", ("--cluster-key", "tasks=status,due_date,id", "--sort-memory", "64K"))):
+            run_main(*self.SYNTHETIC, "--format", "copy", "-o", self.path(name), *cluster)
+        with open(self.path("plain.sql"), encoding="utf-8") as f:
+            plain = parse_copy(f.read())
+        with open(self.path("clustered.sql"), encoding="utf-8") as f:
+            clustered = parse_copy(f.read())
+        self.assertEqual(list(clustered), [table for table in generate_sql.TABLES if table in plain])
+        for table, rows in clustered.items():
+            self.assertCountEqual(rows, plain[table])
+            if table in keys:
+                key = generate_sql.cluster_sort_key([generate_sql.COLUMN_INDEXES[table][column] for column in keys[table]])
+                self.assertEqual(rows, sorted(rows, key=key), table)
+            else:
+                self.assertEqual(rows, plain[table], table)
+
+    def test_spilled_runs_merge_in_order(self):
+        shards = generate_sql.synthetic_shards(users=200, workspaces=3)
+        clustered = generate_sql.ClusteredTables(generate_sql.CLUSTER_KEYS, 64 << 10)
+        rows = list(generate_sql.clustered_rows(clustered, shards))
+        self.assertGreater(clustered.spilled, 0)
+        expected = {}
+        for table, row in generate_sql.shard_rows(generate_sql.synthetic_shards(users=200, workspaces=3)):
+            expected.setdefault(table, []).append(row)
+        for table, table_rows in expected.items():
+            if table in generate_sql.CLUSTER_KEYS:
+                table_rows.sort(key=clustered.keys[table])
+        self.assertEqual(rows, [(table, row) for table in generate_sql.TABLES for row in expected.get(table, ())])
+
+    def test_nulls_sort_last(self):
+        key = generate_sql.cluster_sort_key([0, 1])
+        self.assertEqual(sorted([(None, "a"), ("b", None), ("a", "b"), ("b", "a")], key=key),
+                         [("a", "b"), ("b", "a"), ("b", None), (None, "a")])
+
+class JobsTest(TempDirTestCase):
+    # Workspaces of 15,000 rows, more than one encoding chunk each.
+    SYNTHETIC = ("--synthetic", "--users", "100", "--workspaces", "3", "--tasks-per-book", "500",
+                 "--rollups", "--rollup-as-of", "2026-01-01T00:00:00.000Z")
+
+    def test_output_matches_a_serial_run(self):
+        for fmt in ("insert", "batched", "copy", "binary"):
+            outputs = []
+            for jobs in ("1", "2", "3"):
+                output = self.path(f"{fmt}_{jobs}")
+                run_main(*self.SYNTHETIC, "--format", fmt, "--jobs", jobs, "-o", output)
+                if fmt == "binary":
+                    outputs.append({name: read_bytes(os.path.join(output, name)) for name in sorted(os.listdir(output))})
+                else:
+                    outputs.append(read_bytes(output))
+            self.assertEqual(outputs[1], outputs[0], fmt)
+            self.assertEqual(outputs[2], outputs[0], fmt)
+
+class DiffTest(TempDirTestCase):
+    def diff(self, input_path, name):
+        output = self.path(name)
+        run_main("-i", input_path, "--diff", "--hash-cache", self.path("hashes.sqlite"), "-o", output)
+        with open(output, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_only_changed_rows_are_emitted(self):
+        records = list(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+        input_path = self.path("input.ndjson")
+        write_records(input_path, records)
+        old_rows = input_rows(input_path)
+        first = self.diff(input_path, "first.sql")
+        self.assertEqual(first[1:-1], [generate_sql.format_upsert(table, row) for table, row in old_rows])
+        run_main("--diff-commit", "--hash-cache", self.path("hashes.sqlite"))
+
+        # Rename a user and a book and drop a task.
+        users = [obj for kind, obj in records if kind == "user"]
+        users[0]["name"] = "Renamed User"
+        book = next(book for kind, obj in records if kind == "workspace" for book in obj["books"] if book.get("tasks"))
+        book["name"] = "Renamed Book"
+        dropped = book["tasks"].pop()
+        write_records(input_path, records)
+        new_rows = input_rows(input_path)
+        old = {(table, row[0]): row for table, row in old_rows}
+        changed = [generate_sql.format_upsert(table, row) for table, row in new_rows if old.get((table, row[0])) != row]
+        self.assertEqual(len(changed), 2)
+        expected = ["BEGIN;", f"DELETE FROM tasks WHERE id IN ('{dropped['id']}');", *changed, "COMMIT;"]
+        self.assertEqual(self.diff(input_path, "second.sql"), expected)
+        # Until it is committed, the diff is produced again.
+        self.assertEqual(self.diff(input_path, "again.sql"), expected)
+        run_main("--diff-commit", "--hash-cache", self.path("hashes.sqlite"))
+        self.assertEqual(self.diff(input_path, "third.sql"), ["BEGIN;", "COMMIT;"])
+
+    def test_commit_needs_a_pending_diff(self):
+        with self.assertRaisesRegex(SystemExit, "no pending --diff"):
+            run_main("--diff-commit", "--hash-cache", self.path("hashes.sqlite"))
+
+class StatsTest(TempDirTestCase):
+    def stats(self, *argv):
+        run_main(*argv, "--stats-file", self.path("stats.json"))
+        with open(self.path("stats.json")) as f:
+            return json.load(f)
+
+    def test_table_bytes_add_up_for_insert(self):
+        for jobs in ("1", "2"):
+            output = self.path(f"out_{jobs}.sql")
+            report = self.stats("-o", output, "--jobs", jobs)
+            self.assertEqual(sum(table["bytes"] for table in report["tables"].values()), os.path.getsize(output))
+            self.assertEqual(report["encoded_bytes"], os.path.getsize(output))
+
+    def test_every_table_with_rows_has_bytes(self):
+        for fmt in ("insert", "batched", "copy", "binary"):
+            for jobs in ("1", "2"):
+                report = self.stats("--format", fmt, "--jobs", jobs, "-o", self.path(f"{fmt}_{jobs}"))
+                for name, table in report["tables"].items():
+                    self.assertEqual(table["bytes"] > 0, table["rows"] > 0, (fmt, jobs, name))
+
+class RollupsTest(TempDirTestCase):
+    def rollup_rows(self, as_of=None):
+        shards = generate_sql.record_shards(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+        return list(generate_sql.shard_rows(generate_sql.rollup_shards(shards, as_of)))
+
+    def test_as_of_defaults_to_the_latest_change_of_each_workspace(self):
+        rows = self.rollup_rows()
+        index = generate_sql.COLUMN_INDEXES
+        book_workspaces = {row[0]: row[1] for table, row in rows if table == "books"}
+        owners = {"workspaces": lambda row: row[0], "books": lambda row: row[1],
+                  "tasks": lambda row: book_workspaces[row[1]], "royalties": lambda row: book_workspaces[row[1]]}
+        latest = {}
+        for table, row in rows:
+            if table in owners:
+                ws_id = owners[table](row)
+                latest[ws_id] = max(latest.get(ws_id, ""), row[index[table]["updated_at"]])
+        stats = {table: {row[0]: row for t, row in rows if t == table} for table in generate_sql.ROLLUP_TABLES}
+        self.assertEqual({ws_id: row[index["workspace_stats"]["as_of"]] for ws_id, row in stats["workspace_stats"].items()}, latest)
+        for row in stats["book_stats"].values():
+            self.assertEqual(row[index["book_stats"]["as_of"]], latest[row[1]])
+
+    def test_output_is_reproducible(self):
+        for name in ("first.sql", "second.sql"):
+            run_main("--rollups", "-o", self.path(name))
+        self.assertEqual(read_bytes(self.path("first.sql")), read_bytes(self.path("second.sql")))
+
+    def test_explicit_as_of(self):
+        rows = self.rollup_rows("2026-01-01T00:00:00.000Z")
+        stats = [row for table, row in rows if table in generate_sql.ROLLUP_TABLES]
+        self.assertTrue(stats)
+        self.assertEqual({row[-1] for row in stats}, {"2026-01-01T00:00:00.000Z"})
+
+class IndexAdvisorTest(TempDirTestCase):
+    def advise(self, *queries):
+        path = self.path("index.js")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"await pool.query('{query}', [id]);\n" for query in queries)
+        advised, _ = generate_sql.advise_indexes(path)
+        return {(table, tuple(column for column, _ in key)): tuple(include) for table, key, include, _ in advised}
+
+    def test_narrow_selected_columns_are_included(self):
+        self.assertEqual(self.advise("SELECT id, share_percentage, earnings FROM royalties WHERE author_book_id = $1"),
+                         {("royalties", ("author_book_id",)): ("id", "share_percentage", "earnings")})
+
+    def test_star_selects_get_no_include(self):
+        for query in ("SELECT * FROM royalties WHERE author_book_id = $1",
+                      "SELECT r.* FROM royalties r WHERE r.author_book_id = $1",
+                      "SELECT wm.*, u.name FROM workspace_members wm JOIN users u ON wm.user_id = u.id WHERE wm.workspace_id = $1"):
+            self.assertEqual(set(self.advise(query).values()), {()}, query)
+
+    def test_wide_or_many_columns_get_no_include(self):
+        for query in ("SELECT id, message FROM workspace_members WHERE workspace_id = $1",
+                      "SELECT id, user_id, role, created_at FROM workspace_members WHERE workspace_id = $1"):
+            self.assertEqual(set(self.advise(query).values()), {()}, query)
+
+    def test_joined_star_does_not_prevent_include(self):
+        self.assertEqual(self.advise("SELECT wm.user_id, u.* FROM workspace_members wm JOIN users u ON wm.user_id = u.id WHERE wm.workspace_id = $1"),
+                         {("workspace_members", ("workspace_id",)): ("user_id",)})
+
+class SubsetTest(TempDirTestCase):
+    SYNTHETIC = dict(users=300, workspaces=4)
+
+    def subset(self, **roots):
+        subset = generate_sql.Subset(**roots)
+        rows = list(subset.rows(generate_sql.shard_rows(generate_sql.synthetic_shards(**self.SYNTHETIC))))
+        return subset, rows
+
+    def assert_closed(self, rows):
+        foreign_keys, unique_keys, _ = generate_sql.integrity_rules(generate_sql.parse_prisma_schema()[0])
+        validator = generate_sql.IntegrityValidator(foreign_keys, unique_keys)
+        validator.check(rows)
+        self.assertEqual(validator.finish(), {})
+
+    def test_workspace_subset_is_closed(self):
+        subset, rows = self.subset(workspace_ids=["org_2"])
+        self.assert_closed(rows)
+        self.assertEqual({row[0] for table, row in rows if table == "workspaces"}, {"org_2"})
+        all_rows = list(generate_sql.shard_rows(generate_sql.synthetic_shards(**self.SYNTHETIC)))
+        books = {row[0] for table, row in all_rows if table == "books" and row[1] == "org_2"}
+        self.assertEqual({row[0] for table, row in rows if table == "books"}, books)
+        self.assertEqual(len([row for table, row in rows if table == "tasks"]),
+                         len([row for table, row in all_rows if table == "tasks" and row[1] in books]))
+        self.assertLess(subset.counts["users"], self.SYNTHETIC["users"])
+        self.assertEqual(subset.missing_users, set())
+
+    def test_book_subset_is_closed(self):
+        book_id = next(row[0] for table, row in generate_sql.shard_rows(generate_sql.synthetic_shards(**self.SYNTHETIC))
+                       if table == "books" and row[1] == "org_3")
+        subset, rows = self.subset(book_ids=[book_id])
+        self.assert_closed(rows)
+        self.assertEqual({row[0] for table, row in rows if table == "books"}, {book_id})
+        self.assertEqual({row[0] for table, row in rows if table == "workspaces"}, {"org_3"})
+
+    def test_memory_does_not_grow_with_the_users(self):
+        # 300,000 users held by id would take well over 100 MB.
+        synthetic = ("--synthetic", "--users", "300000", "--workspaces", "1", "--books-per-workspace", "1")
+        streaming = peak_rss(*synthetic, "-o", self.path("all.sql"))
+        subset = peak_rss(*synthetic, "--subset-workspace", "org_1", "-o", self.path("subset.sql"))
+        self.assertLess(subset, streaming + (32 << 20))
+
+class SnapshotTest(TempDirTestCase):
+    def test_round_trip_is_byte_identical(self):
+        input_path = self.path("input.ndjson")
+        write_ndjson(input_path, 50)
+        run_main("-i", input_path, "-o", self.path("parsed.sql"))
+        for name in ("cold.sql", "warm.sql"):
+            run_main("-i", input_path, "--snapshot-cache", self.path("cache"), "-o", self.path(name))
+            self.assertEqual(read_bytes(self.path(name)), read_bytes(self.path("parsed.sql")))
+        self.assertEqual(len(os.listdir(self.path("cache"))), 1)
+
+    def test_memory_does_not_grow_with_the_input(self):
+        # About 20 MB of input: held whole, the shards would take well over
+        # 100 MB on top of a streaming run.
+        input_path = self.path("input.ndjson")
+        write_ndjson(input_path, 2500)
+        output = self.path("out.sql")
+        streaming = peak_rss("-i", input_path, "-o", output)
+        for _ in ("cold", "warm"):
+            self.assertLess(peak_rss("-i", input_path, "--snapshot-cache", self.path("cache"), "-o", output), streaming + (32 << 20))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+import generate_sql
+
+# Smoke test for --load and the --fast-load envelope against a throwaway
+# PostgreSQL database; it is skipped unless SEED_TEST_DSN is set, e.g.
+#   SEED_TEST_DSN=postgresql://postgres@localhost/postgres python -m unittest test_load
+# Every test works in a schema of its own, created from TABLES and the Prisma
+# schema without the rollup tables, and dropped again afterwards.
+DSN = os.environ.get("SEED_TEST_DSN")
+AS_OF = "2026-01-01T00:00:00.000Z"
+
+def expected_counts(rollups=False):
+    shards = generate_sql.record_shards(generate_sql.iter_js_records(io.StringIO(generate_sql.dummy_data)))
+    if rollups:
+        shards = generate_sql.rollup_shards(shards, AS_OF)
+    counts = Counter(table for table, _ in generate_sql.shard_rows(shards))
+    return {table: counts[table] for table in generate_sql.TABLES if rollups or table not in generate_sql.ROLLUP_TABLES}
+
+@unittest.skipUnless(DSN and generate_sql.psycopg is not None, "set SEED_TEST_DSN and install psycopg to run")
+class PostgresLoadTest(unittest.TestCase):
+    def setUp(self):
+        from psycopg.conninfo import make_conninfo
+        self.schema = f"seed_smoke_{os.getpid()}"
+        self.db = generate_sql.psycopg.connect(DSN, autocommit=True)
+        self.db.execute(f"CREATE SCHEMA {self.schema}")
+        self.db.execute(f"SET search_path = {self.schema}")
+        base_tables = [table for table in generate_sql.TABLES if table not in generate_sql.ROLLUP_TABLES]
+        for statement in generate_sql.postgres_ddl(base_tables):
+            self.db.execute(statement)
+        self.dsn = make_conninfo(DSN, options=f"-c search_path={self.schema}")
+
+    def tearDown(self):
+        self.db.execute(f"DROP SCHEMA {self.schema} CASCADE")
+        self.db.close()
+
+    def run_main(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_sql.main(list(argv))
+
+    def counts(self):
+        return {table: self.db.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in generate_sql.TABLES
+                if self.db.execute("SELECT to_regclass(%s)", (table,)).fetchone()[0] is not None}
+
+    def test_load(self):
+        self.run_main("--load", self.dsn)
+        self.assertEqual(self.counts(), expected_counts())
+
+    def test_truncate_reloads(self):
+        # The rollup tables do not exist here, which --truncate must not mind.
+        for _ in range(2):
+            self.run_main("--load", self.dsn, "--truncate", "--connections", "2")
+            self.assertEqual(self.counts(), expected_counts())
+
+    def test_rollups_create_their_tables(self):
+        self.run_main("--load", self.dsn, "--rollups", "--rollup-as-of", AS_OF)
+        self.assertEqual(self.counts(), expected_counts(rollups=True))
+        self.run_main("--load", self.dsn, "--rollups", "--rollup-as-of", AS_OF, "--truncate")
+        self.assertEqual(self.counts(), expected_counts(rollups=True))
+        # The rollup tables reference the loaded tables, so they are emptied
+        # along with them even when this load does not write them.
+        self.run_main("--load", self.dsn, "--truncate")
+        self.assertEqual(self.counts(), {**expected_counts(), "book_stats": 0, "workspace_stats": 0})
+
+    def test_truncate_does_not_cascade_outside_the_seed(self):
+        self.db.execute("CREATE TABLE user_preferences (user_id TEXT PRIMARY KEY REFERENCES users (id))")
+        self.run_main("--load", self.dsn)
+        self.db.execute("INSERT INTO user_preferences SELECT id FROM users")
+        with self.assertRaisesRegex(RuntimeError, "user_preferences references users"):
+            self.run_main("--load", self.dsn, "--truncate")
+        self.assertEqual(self.counts(), expected_counts())
+        self.assertEqual(self.db.execute("SELECT count(*) FROM user_preferences").fetchone()[0], expected_counts()["users"])
+
+    def test_fast_load_script(self):
+        # Without and then with the rollup tables, so the postamble's ANALYZE
+        # sees both a missing and an existing optional table.
+        with tempfile.TemporaryDirectory() as directory:
+            for rollups in (False, True):
+                path = os.path.join(directory, "seed.sql")
+                self.run_main("--fast-load", "-o", path, *(["--rollups", "--rollup-as-of", AS_OF] if rollups else []))
+                self.db.execute(f"TRUNCATE {', '.join(self.counts())} CASCADE")
+                with open(path, encoding="utf-8") as f:
+                    self.db.execute(f.read())
+                self.assertEqual(self.counts(), expected_counts(rollups))
+
+if __name__ == "__main__":
+    unittest.main()